@@ -0,0 +1,260 @@
+import sys
+import time
+import hashlib
+import logging
+from collections import OrderedDict
+from datetime import datetime
+from functools import lru_cache
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def tr_timezone():
+    """Türkiye saat dilimi (pytz ilk kullanımda yüklenir)"""
+    from pytz import timezone
+    return timezone('Europe/Istanbul')
+
+
+@lru_cache(maxsize=4096)
+def format_appointment_date(appointment_date):
+    """Randevu tarihini Türkiye saat dilimine çevir (aynı tarih metni bir kez çözümlenir)"""
+    if not appointment_date:
+        return 'Tarih bilgisi yok'
+    try:
+        date_obj = datetime.fromisoformat(appointment_date.replace('Z', '+00:00'))
+        tr_date = date_obj.astimezone(tr_timezone())
+        return tr_date.strftime('%d.%m.%Y %H:%M')
+    except ValueError as e:
+        logger.warning(f"Tarih çevirme hatası: {str(e)}")
+        return appointment_date
+
+
+@lru_cache(maxsize=4096)
+def appointment_day(appointment_date):
+    """Randevunun Türkiye saatine göre günü, tarih yoksa None"""
+    if not appointment_date:
+        return None
+    try:
+        date_obj = datetime.fromisoformat(appointment_date.replace('Z', '+00:00'))
+        return date_obj.astimezone(tr_timezone()).date()
+    except ValueError:
+        return None
+
+
+def _intern(value, default=''):
+    # Tekrarlayan ülke, merkez ve kategori adları bellekte tek kopya tutulur
+    if not isinstance(value, str):
+        return default
+    return sys.intern(value)
+
+
+class Appointment:
+    """Randevu listesindeki tek kaydın sıkıştırılmış hali"""
+
+    __slots__ = ('source', 'mission', 'center', 'category', 'date', 'link')
+
+    def __init__(self, source, mission, center, category, date, link):
+        self.source = source
+        self.mission = mission
+        self.center = center
+        self.category = category
+        self.date = date
+        self.link = link
+
+    @classmethod
+    def from_feed(cls, entry):
+        """API kaydından oluştur"""
+        return cls(
+            _intern(entry.get('source_country')),
+            _intern(entry.get('mission_country')),
+            _intern(entry.get('center_name')),
+            _intern(entry.get('visa_category'), 'Belirtilmemiş'),
+            _intern(entry.get('appointment_date'), None),
+            entry.get('book_now_link') or '#'
+        )
+
+    @classmethod
+    def from_tuple(cls, values):
+        """astuple() çıktısından oluştur"""
+        source, mission, center, category, date, link = values
+        return cls(_intern(source), _intern(mission), _intern(center), _intern(category), _intern(date, None), link)
+
+    def astuple(self):
+        """Süreçler arası aktarım için düz liste"""
+        return (self.source, self.mission, self.center, self.category, self.date, self.link)
+
+    @property
+    def formatted_date(self):
+        """Türkiye saatine göre tarih"""
+        return format_appointment_date(self.date)
+
+    @property
+    def day(self):
+        """Türkiye saatine göre randevu günü"""
+        return appointment_day(self.date)
+
+    def __repr__(self):
+        return f"Appointment({self.mission!r}, {self.center!r}, {self.category!r}, {self.date!r})"
+
+
+def filter_appointments(records, country, city):
+    """Akıştan ülke ve şehre uyan randevuları ayıkla"""
+    available_appointments = []
+    city_lower = city.lower() if city else None
+    for record in records:
+        try:
+            appointment = record if isinstance(record, Appointment) else Appointment.from_feed(record)
+
+            # Ülke ve şehir kontrolü
+            if (
+                appointment.source == 'Turkiye'
+                and country == appointment.mission
+                and appointment.center and city_lower and city_lower in appointment.center.lower()
+            ):
+                available_appointments.append(appointment)
+        except Exception as e:
+            logger.warning(f"Randevu işleme hatası: {str(e)}")
+            continue
+    return available_appointments
+
+
+class SnapshotIndex:
+    """Randevu listesinin (kaynak ülke, görevli ülke, şehir) anahtarlı dizini"""
+
+    def __init__(self, records, cities):
+        self.cities = frozenset(cities)
+        self.records = []
+        self._index = {}
+        self.matches = {}  # Çözümleme havuzunda önceden hesaplanan takip eşleşmeleri (takip anahtarı -> randevular)
+
+        # Merkez adları tekrar ettiği için şehir eşleştirmesi merkez başına bir kez yapılır
+        lowered_cities = [(city, city.lower()) for city in cities]
+        center_cities = {}
+        for record in records:
+            try:
+                appointment = record if isinstance(record, Appointment) else Appointment.from_feed(record)
+                self.records.append(appointment)
+                center = appointment.center
+                if not center:
+                    continue
+                matched = center_cities.get(center)
+                if matched is None:
+                    center_lower = center.lower()
+                    matched = tuple(city for city, city_lower in lowered_cities if city_lower in center_lower)
+                    center_cities[center] = matched
+                for city in matched:
+                    self._index.setdefault((appointment.source, appointment.mission, city), []).append(appointment)
+            except Exception as e:
+                logger.warning(f"Randevu işleme hatası: {str(e)}")
+                continue
+
+    @classmethod
+    def from_groups(cls, records, cities, groups):
+        """Önceden hesaplanmış (anahtar -> kayıt sıraları) gruplarından dizin kur"""
+        snapshot = cls((), cities)
+        snapshot.records = records
+        snapshot._index = {key: [records[i] for i in positions] for key, positions in groups.items()}
+        return snapshot
+
+    def lookup(self, country, city, source_country='Turkiye'):
+        """Ülke ve şehre uyan randevuları döndür"""
+        if city not in self.cities:
+            # Dizinde olmayan şehirler için doğrusal taramaya dön
+            return filter_appointments(self.records, country, city)
+        return self._index.get((source_country, country, city), [])
+
+    def items(self):
+        """Dizinin ((kaynak, görevli ülke, şehir), randevular) çiftleri"""
+        return self._index.items()
+
+    def groups(self, source_country='Turkiye'):
+        """Kaynak ülkenin (görevli ülke, şehir) gruplarını ve randevularını döndür"""
+        for (source, mission, city), appointments in self._index.items():
+            if source == source_country:
+                yield mission, city, appointments
+
+    def __len__(self):
+        return len(self.records)
+
+
+def format_appointment_message(country, appt):
+    """Randevu bildirim mesajını oluştur"""
+    return (
+        f"🎉 {country} için randevu bulundu!\n\n"
+        f"📍 Merkez: {appt.center}\n"
+        f"📅 Tarih: {appt.formatted_date}\n"
+        f"📋 Kategori: {appt.category}\n"
+        f"🔗 Randevu Linki:\n{appt.link}"
+    )
+
+
+def format_gone_message(country, appt):
+    """Kapanan randevu bildirim mesajını oluştur"""
+    return (
+        f"⌛ {country} randevusu artık listede yok\n\n"
+        f"📍 Merkez: {appt.center}\n"
+        f"📅 Tarih: {appt.formatted_date}\n"
+        f"📋 Kategori: {appt.category}"
+    )
+
+
+def appointment_fingerprint(appt):
+    """Randevuyu tanımlayan kısa özet"""
+    key = "\x1f".join((appt.mission, appt.center, appt.category, appt.date or '', appt.link))
+    return hashlib.blake2b(key.encode(), digest_size=8).hexdigest()
+
+
+class SeenSet:
+    """Süre aşımlı ve boyutu sınırlı görülen randevu kümesi"""
+
+    def __init__(self, max_size=1000, ttl=24 * 3600):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # özet -> son görülme zamanı
+
+    def touch(self, fingerprint, now=None):
+        """Özeti görüldü olarak işaretle"""
+        now = time.time() if now is None else now
+        self._entries[fingerprint] = now
+        self._entries.move_to_end(fingerprint)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def expire(self, now=None):
+        """Süresi dolan özetleri sil"""
+        now = time.time() if now is None else now
+        while self._entries:
+            fingerprint, seen_at = next(iter(self._entries.items()))
+            if now - seen_at < self.ttl:
+                break
+            self._entries.popitem(last=False)
+
+    def __contains__(self, fingerprint):
+        return fingerprint in self._entries
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class AppointmentDiff:
+    """Ardışık eşleşme listelerini karşılaştırıp yeni ve kapanan randevuları bulur"""
+
+    def __init__(self, max_size=1000, ttl=24 * 3600):
+        self.seen = SeenSet(max_size, ttl)
+        self.active = {}  # Son turda listede olan randevular
+
+    def update(self, matches, now=None):
+        """Yeni eşleşmeleri işle, (yeni, kapanan) listelerini döndür"""
+        now = time.time() if now is None else now
+        self.seen.expire(now)
+        current = {appointment_fingerprint(appt): appt for appt in matches}
+        new = [
+            appt for fingerprint, appt in current.items()
+            if fingerprint not in self.active and fingerprint not in self.seen
+        ]
+        gone = [appt for fingerprint, appt in self.active.items() if fingerprint not in current]
+        for fingerprint in current:
+            self.seen.touch(fingerprint, now)
+        self.active = current
+        return new, gone
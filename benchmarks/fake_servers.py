@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""Randevu API'si ve Telegram Bot API'si yerine geçen yerel test sunucuları"""
+import json
+import time
+import random
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Takip edilen çiftler değişen randevuları alır, diğer kayıtlar sabit kalır
+WATCHED_MISSIONS = ['France', 'Netherlands', 'Malta']
+OTHER_MISSIONS = ['Ireland', 'Sweden', 'Czechia', 'Croatia', 'Bulgaria', 'Finland', 'Slovenia',
+                  'Denmark', 'Norway', 'Estonia', 'Lithuania', 'Luxembourg', 'Ukraine', 'Latvia']
+CITIES = ['Ankara', 'Istanbul', 'Izmir', 'Antalya', 'Gaziantep', 'Bursa', 'Edirne']
+WATCHED_CITIES = CITIES[:3]
+OTHER_SOURCES = ['India', 'United Kingdom', 'Russia', 'United Arab Emirates', 'Algeria']
+CATEGORIES = ['Tourism', 'Business', 'Family Visit', 'Student']
+
+WATCHED_PAIRS = [(mission, city) for mission in WATCHED_MISSIONS for city in WATCHED_CITIES]
+
+
+def make_record(rng, source, mission, city, slot_id=None):
+    """Sahte randevu kaydı oluştur"""
+    date = datetime(2026, 1, 1, tzinfo=timezone.utc) + timedelta(minutes=15 * rng.randrange(40000))
+    link = f"https://example.invalid/book?slot={slot_id}" if slot_id is not None else "https://example.invalid/book"
+    return {
+        'source_country': source,
+        'mission_country': mission,
+        'center_name': f"{mission} Visa Application Centre - {city}",
+        'visa_category': rng.choice(CATEGORIES),
+        'appointment_date': date.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'book_now_link': link
+    }
+
+
+class FakeVisaAPI:
+    """Belirli aralıklarla değişen sahte randevu listesi"""
+
+    def __init__(self, records, change_every=2.0, churn=5, dynamic=20, validators=True, seed=1):
+        self.rng = random.Random(seed)
+        self.change_every = change_every
+        self.churn = churn
+        self.validators = validators
+        self.requests = 0
+        self.not_modified = 0
+        self.changes = {}  # randevu no -> listeye girdiği zaman
+        self._next_slot = 0
+        self._version = 0
+        self._modified = time.time()
+
+        # Büyük sabit kısım bir kez serileştirilir, yalnızca değişen kısım yeniden yazılır
+        static = []
+        for _ in range(max(0, records - dynamic)):
+            if self.rng.random() < 0.25:
+                record = make_record(self.rng, 'Turkiye', self.rng.choice(OTHER_MISSIONS), self.rng.choice(CITIES))
+            else:
+                record = make_record(self.rng, self.rng.choice(OTHER_SOURCES),
+                                     self.rng.choice(WATCHED_MISSIONS + OTHER_MISSIONS), self.rng.choice(CITIES))
+            static.append(json.dumps(record))
+        self._static = ",".join(static).encode()
+        self._dynamic = [self._new_slot() for _ in range(dynamic)]
+        self._render()
+
+    def _new_slot(self):
+        slot_id = self._next_slot
+        self._next_slot += 1
+        mission, city = self.rng.choice(WATCHED_PAIRS)
+        self.changes[slot_id] = time.time()
+        return make_record(self.rng, 'Turkiye', mission, city, slot_id)
+
+    def _render(self):
+        dynamic = ",".join(json.dumps(record) for record in self._dynamic).encode()
+        parts = [part for part in (self._static, dynamic) if part]
+        self.body = b"[" + b",".join(parts) + b"]"
+        self._version += 1
+        self._modified = time.time()
+
+    def change(self):
+        """Rastgele randevuları yenileriyle değiştir"""
+        for _ in range(self.churn):
+            self._dynamic[self.rng.randrange(len(self._dynamic))] = self._new_slot()
+        self._render()
+
+    async def change_loop(self):
+        while True:
+            await asyncio.sleep(self.change_every)
+            self.change()
+
+    async def visa_list(self, request):
+        self.requests += 1
+        # Yavaş kaynak denemeleri için: /api/visa-list/?delay=5
+        delay = float(request.query.get('delay', 0))
+        if delay:
+            await asyncio.sleep(delay)
+        etag = f'"v{self._version}"'
+        if self.validators and request.headers.get("If-None-Match") == etag:
+            self.not_modified += 1
+            return web.Response(status=304)
+        headers = {"Content-Type": "application/json"}
+        if self.validators:
+            headers["ETag"] = etag
+            headers["Last-Modified"] = formatdate(self._modified, usegmt=True)
+        return web.Response(body=self.body, headers=headers)
+
+    async def stats(self, request):
+        return web.json_response({
+            'requests': self.requests,
+            'not_modified': self.not_modified,
+            'payload_bytes': len(self.body),
+            'changes': self.changes
+        })
+
+
+class FakeTelegramAPI:
+    """Gelen mesajları zamanıyla kaydeden sahte Telegram Bot API'si"""
+
+    def __init__(self):
+        self.deliveries = []  # (zaman, sohbet, metin)
+        self._message_id = 0
+
+    async def method(self, request):
+        name = request.match_info['method']
+        if request.content_type == 'application/json':
+            params = await request.json()
+        else:
+            params = dict(await request.post())
+
+        if name == 'getMe':
+            result = {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'}
+        elif name == 'sendMessage':
+            self._message_id += 1
+            chat_id = int(params['chat_id'])
+            self.deliveries.append((time.time(), chat_id, params['text']))
+            result = {
+                'message_id': self._message_id,
+                'date': int(time.time()),
+                'chat': {'id': chat_id, 'type': 'private'},
+                'text': params['text']
+            }
+        else:
+            result = True
+        return web.json_response({'ok': True, 'result': result})
+
+    async def stats(self, request):
+        return web.json_response({'deliveries': self.deliveries})
+
+
+async def serve(records, api_port, telegram_port, ready=None, **options):
+    """İki sunucuyu başlat ve süresiz çalıştır"""
+    visa_api = FakeVisaAPI(records, **options)
+    telegram_api = FakeTelegramAPI()
+
+    api_app = web.Application()
+    api_app.router.add_get('/api/visa-list/', visa_api.visa_list)
+    api_app.router.add_get('/_stats', visa_api.stats)
+
+    telegram_app = web.Application(client_max_size=16 * 1024 ** 2)
+    telegram_app.router.add_post('/bot{token}/{method}', telegram_api.method)
+    telegram_app.router.add_get('/_stats', telegram_api.stats)
+
+    runners = []
+    for app, port in ((api_app, api_port), (telegram_app, telegram_port)):
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        await web.TCPSite(runner, '127.0.0.1', port).start()
+        runners.append(runner)
+
+    change_task = asyncio.create_task(visa_api.change_loop())
+    if ready is not None:
+        ready.set()
+    try:
+        await asyncio.Event().wait()
+    finally:
+        change_task.cancel()
+        for runner in runners:
+            await runner.cleanup()
+
+
+def run_servers(records, api_port, telegram_port, ready=None, **options):
+    """Sunucuları ayrı süreçte çalıştırmak için giriş noktası"""
+    asyncio.run(serve(records, api_port, telegram_port, ready, **options))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--records', type=int, default=10000)
+    parser.add_argument('--api-port', type=int, default=8081)
+    parser.add_argument('--telegram-port', type=int, default=8082)
+    parser.add_argument('--change-every', type=float, default=2.0)
+    args = parser.parse_args()
+    print(f"Randevu API'si: http://127.0.0.1:{args.api_port}/api/visa-list/")
+    print(f"Telegram API'si: http://127.0.0.1:{args.telegram_port}/bot")
+    run_servers(args.records, args.api_port, args.telegram_port, change_every=args.change_every)
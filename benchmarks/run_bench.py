@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""Yeni randevudan Telegram mesajına kadar geçen süreyi yerel sunucularla ölçer"""
+import os
+import re
+import sys
+import json
+import time
+import socket
+import asyncio
+import logging
+import resource
+import argparse
+import tempfile
+import multiprocessing
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fake_servers import WATCHED_PAIRS, run_servers  # noqa: E402
+
+SLOT_LINK = re.compile(r"slot=(\d+)")
+BENCH_TOKEN = "123456:BENCH"
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def percentile(values, fraction):
+    if not values:
+        return float('nan')
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+async def fetch_json(url):
+    import aiohttp
+    async with aiohttp.ClientSession() as session:
+        async with session.get(url) as response:
+            return await response.json()
+
+
+async def drive_bot(args, api_port, telegram_port):
+    """VisaBot'u sahte sunuculara karşı çalıştır ve ölçümleri döndür"""
+    import schengen_bot
+    from telegram.ext import Application
+    from notifier import Notifier
+    from scheduler import PollScheduler
+    from storage import Storage
+
+    tmpdir = tempfile.mkdtemp(prefix="visa-bench-")
+    bot = schengen_bot.VisaBot()
+    bot.feed.url = f"http://127.0.0.1:{api_port}/api/visa-list/"
+    bot.storage = Storage(os.path.join(tmpdir, "bench.db"))
+    bot.scheduler = PollScheduler(min_interval=args.interval, jitter=0)
+    bot.app = Application.builder().token(BENCH_TOKEN).base_url(f"http://127.0.0.1:{telegram_port}/bot").build()
+    await bot.app.initialize()
+    bot.notifier = Notifier(bot.app.bot.send_message, global_rate=args.telegram_rate, chat_rate=args.telegram_rate)
+    bot.notifier.start()
+    bot.storage.open()
+    bot.storage.start()
+
+    for chat_id in range(1, args.subscribers + 1):
+        mission, city = WATCHED_PAIRS[chat_id % len(WATCHED_PAIRS)]
+        bot.registry.add(chat_id, mission, city, frequency=args.interval / 60)
+
+    # İlk turdaki toplu bildirimler ölçüme katılmaz
+    started_at = time.time()
+    bot.ensure_checking()
+    await asyncio.sleep(args.warmup)
+    measure_from = time.time()
+    cpu_before = time.process_time()
+    stats_before = await fetch_json(f"http://127.0.0.1:{api_port}/_stats")
+
+    await asyncio.sleep(args.duration)
+
+    cpu_used = time.process_time() - cpu_before
+    stats_after = await fetch_json(f"http://127.0.0.1:{api_port}/_stats")
+    await bot.stop_checking()
+    await bot.notifier.stop()
+    await bot.feed.close()
+    bot.decode_pool.close()
+    await bot.storage.close()
+    await bot.app.shutdown()
+    deliveries = (await fetch_json(f"http://127.0.0.1:{telegram_port}/_stats"))['deliveries']
+
+    # Her randevu için ilk teslimat zamanı
+    changes = {int(slot): at for slot, at in stats_after['changes'].items()}
+    first_delivery = {}
+    for delivered_at, _chat_id, text in deliveries:
+        for slot in SLOT_LINK.findall(text):
+            slot = int(slot)
+            if slot not in first_delivery or delivered_at < first_delivery[slot]:
+                first_delivery[slot] = delivered_at
+    latencies = [
+        (first_delivery[slot] - changed_at) * 1000
+        for slot, changed_at in changes.items()
+        if changed_at >= measure_from and slot in first_delivery
+    ]
+    ticks = max(1, stats_after['requests'] - stats_before['requests'])
+    return {
+        'records': args.records,
+        'payload_mb': stats_after['payload_bytes'] / 1024 ** 2,
+        'ticks': ticks,
+        'not_modified': stats_after['not_modified'] - stats_before['not_modified'],
+        'slots': sum(1 for at in changes.values() if at >= measure_from),
+        'delivered': len(latencies),
+        'messages': sum(1 for delivered_at, _, _ in deliveries if delivered_at >= started_at),
+        'p50_ms': percentile(latencies, 0.50),
+        'p99_ms': percentile(latencies, 0.99),
+        'cpu_ms_per_tick': cpu_used * 1000 / ticks,
+        'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    }
+
+
+def bench_size(args, results):
+    """Tek bir kayıt sayısı için ölçüm (RSS ölçümü temiz olsun diye ayrı süreçte)"""
+    logging.basicConfig(level=logging.WARNING)
+    logging.getLogger().setLevel(logging.WARNING)
+    api_port, telegram_port = free_port(), free_port()
+    ready = multiprocessing.Event()
+    server = multiprocessing.Process(
+        target=run_servers,
+        args=(args.records, api_port, telegram_port, ready),
+        kwargs={'change_every': args.change_every, 'validators': not args.no_validators},
+        daemon=True
+    )
+    server.start()
+    try:
+        if not ready.wait(timeout=600):
+            raise RuntimeError("Sahte sunucular başlatılamadı")
+        results.put(asyncio.run(drive_bot(args, api_port, telegram_port)))
+    finally:
+        server.terminate()
+        server.join()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--sizes', default="1000,10000,100000,1000000",
+                        help="Virgülle ayrılmış kayıt sayıları")
+    parser.add_argument('--subscribers', type=int, default=100)
+    parser.add_argument('--interval', type=float, default=1.0, help="Kontrol aralığı (saniye)")
+    parser.add_argument('--change-every', type=float, default=2.0, help="Listenin değişme aralığı (saniye)")
+    parser.add_argument('--duration', type=float, default=20.0, help="Ölçüm süresi (saniye)")
+    parser.add_argument('--warmup', type=float, default=3.0, help="Ölçüm öncesi ısınma süresi (saniye)")
+    parser.add_argument('--telegram-rate', type=float, default=1000.0, help="Saniyede gönderilecek mesaj")
+    parser.add_argument('--no-validators', action='store_true', help="ETag/Last-Modified gönderme")
+    parser.add_argument('--json', action='store_true', help="Sonuçları JSON olarak yazdır")
+    args = parser.parse_args()
+
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    for size in [int(value) for value in args.sizes.split(",")]:
+        size_args = argparse.Namespace(**vars(args), records=size)
+        results = context.Queue()
+        worker = context.Process(target=bench_size, args=(size_args, results))
+        worker.start()
+        worker.join()
+        if worker.exitcode != 0:
+            print(f"❌ {size} kayıt için ölçüm başarısız oldu", file=sys.stderr)
+            continue
+        rows.append(results.get())
+
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return
+
+    print(f"{'kayıt':>9} {'MB':>7} {'tur':>5} {'304':>5} {'randevu':>8} {'teslim':>7} "
+          f"{'p50 ms':>8} {'p99 ms':>8} {'CPU ms/tur':>11} {'RSS MB':>8}")
+    for row in rows:
+        print(f"{row['records']:>9} {row['payload_mb']:>7.1f} {row['ticks']:>5} {row['not_modified']:>5} "
+              f"{row['slots']:>8} {row['delivered']:>7} {row['p50_ms']:>8.1f} {row['p99_ms']:>8.1f} "
+              f"{row['cpu_ms_per_tick']:>11.2f} {row['peak_rss_mb']:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import logging
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "kapalı"
+OPEN = "açık"
+HALF_OPEN = "yarı açık"
+
+
+class CircuitOpen(Exception):
+    """Devre açıkken istek yapılmaz"""
+
+    def __init__(self, retry_in):
+        super().__init__(f"devre açık, {retry_in:.0f} saniye sonra denenecek")
+        self.retry_in = retry_in
+
+
+class CircuitBreaker:
+    """Art arda hatalarda kaynağı bir süre devre dışı bırakan, tek deneme isteğiyle geri açan devre kesici"""
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=60, max_reset_timeout=900):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.base_reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self.failures = 0
+        self.opens = 0
+        self._open_until = 0.0
+        self._probing = False
+
+    def allow(self, now):
+        """İstek yapılabilir mi; açık devrenin süresi dolduysa tek deneme isteğine izin ver"""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and now >= self._open_until:
+            self.state = HALF_OPEN
+            logger.info(f"{self.name} devresi yarı açık, deneme isteği gönderiliyor")
+        if self.state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        return False
+
+    def retry_in(self, now):
+        """Bir sonraki denemeye kalan süre (saniye)"""
+        return max(0.0, self._open_until - now)
+
+    def record_success(self):
+        if self.state != CLOSED:
+            logger.info(f"{self.name} devresi kapandı, kaynak yeniden kullanılıyor")
+        self.state = CLOSED
+        self.failures = 0
+        self.reset_timeout = self.base_reset_timeout
+        self._probing = False
+
+    def record_failure(self, now):
+        self.failures += 1
+        if self.state == HALF_OPEN:
+            # Deneme başarısız: devre daha uzun süre açık kalır
+            self.reset_timeout = min(self.max_reset_timeout, self.reset_timeout * 2)
+            self._open(now)
+        elif self.state == CLOSED and self.failures >= self.failure_threshold:
+            self._open(now)
+
+    def abort_probe(self):
+        """İptal edilen deneme isteğinden sonra yeni denemeye izin ver"""
+        self._probing = False
+
+    def _open(self, now):
+        self.state = OPEN
+        self.opens += 1
+        self._probing = False
+        self._open_until = now + self.reset_timeout
+        logger.warning(
+            f"{self.name} devresi açıldı ({self.failures} hata), {self.reset_timeout:.0f} saniye istek yapılmayacak"
+        )
@@ -0,0 +1,315 @@
+import os
+import json
+import zlib
+import fcntl
+import random
+import struct
+import asyncio
+import logging
+import time
+from datetime import datetime
+from appointments import appointment_fingerprint
+from breaker import CircuitOpen
+from filters import WatchFilter
+
+logger = logging.getLogger(__name__)
+
+FRAME_HEADER = struct.Struct("!I")
+
+
+def encode_frame(message):
+    payload = json.dumps(message, separators=(",", ":")).encode()
+    return FRAME_HEADER.pack(len(payload)) + payload
+
+
+class LocalTransport:
+    """Aynı süreçteki düğümler için mesaj aracısı yerine geçen aktarım"""
+
+    def __init__(self):
+        self._queues = set()
+        self._last = None
+        self._publishing = False
+
+    async def start_publisher(self):
+        self._publishing = True
+
+    async def publish(self, message):
+        self._last = message
+        for queue in self._queues:
+            queue.put_nowait(message)
+
+    async def messages(self):
+        """Yayınlanan mesajları sırayla döndür"""
+        if not self._publishing:
+            raise ConnectionError("Yayıncı yok")
+        queue = asyncio.Queue()
+        if self._last is not None:
+            queue.put_nowait(self._last)
+        self._queues.add(queue)
+        try:
+            while True:
+                message = await queue.get()
+                if message is None:
+                    raise ConnectionError("Yayıncı kapandı")
+                yield message
+        finally:
+            self._queues.discard(queue)
+
+    async def close(self):
+        if self._publishing:
+            self._publishing = False
+            for queue in self._queues:
+                queue.put_nowait(None)
+
+
+class UnixSocketTransport:
+    """Unix soketi üzerinden uzunluk önekli JSON mesajları"""
+
+    def __init__(self, path, write_timeout=5):
+        self.path = path
+        self.write_timeout = write_timeout
+        self._server = None
+        self._clients = set()
+        self._last = None
+
+    async def start_publisher(self):
+        # Ölen liderden kalan soket dosyası temizlenir
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(self._on_client, path=self.path)
+        logger.info(f"Yayın soketi açıldı: {self.path}")
+
+    async def _on_client(self, reader, writer):
+        self._clients.add(writer)
+        # Yeni bağlanan işçi son anlık görüntüyü hemen alır
+        if self._last is not None:
+            writer.write(self._last)
+
+    async def publish(self, message):
+        frame = encode_frame(message)
+        self._last = frame
+        for writer in list(self._clients):
+            try:
+                writer.write(frame)
+                await asyncio.wait_for(writer.drain(), timeout=self.write_timeout)
+            except (OSError, asyncio.TimeoutError) as e:
+                # Yavaş veya kopmuş işçi bağlantısı bırakılır, işçi yeniden bağlanır
+                logger.warning(f"İşçi bağlantısı kapatıldı: {str(e) or type(e).__name__}")
+                self._clients.discard(writer)
+                writer.close()
+
+    async def messages(self):
+        """Lidere bağlan ve mesajları sırayla döndür"""
+        try:
+            reader, writer = await asyncio.open_unix_connection(self.path, limit=2 ** 26)
+        except (FileNotFoundError, ConnectionRefusedError) as e:
+            raise ConnectionError(f"Lidere bağlanılamadı: {str(e)}")
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(FRAME_HEADER.size)
+                    payload = await reader.readexactly(FRAME_HEADER.unpack(header)[0])
+                except asyncio.IncompleteReadError:
+                    raise ConnectionError("Lider bağlantısı koptu")
+                yield json.loads(payload)
+        finally:
+            writer.close()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            for writer in self._clients:
+                writer.close()
+            self._clients.clear()
+            await self._server.wait_closed()
+            self._server = None
+            if os.path.exists(self.path):
+                os.unlink(self.path)
+
+
+class FileLeaderLock:
+    """Dosya kilidiyle lider seçimi; lider süreç ölünce kilit kendiliğinden bırakılır"""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = None
+
+    def try_acquire(self):
+        if self._file is not None:
+            return True
+        handle = open(self.path, "a+")
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        handle.seek(0)
+        handle.truncate()
+        handle.write(str(os.getpid()))
+        handle.flush()
+        self._file = handle
+        return True
+
+    def release(self):
+        if self._file is not None:
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+            self._file.close()
+            self._file = None
+
+
+class LocalLeaderLock:
+    """Aynı süreçteki düğümler için lider kilidi"""
+
+    _holders = {}
+
+    def __init__(self, name="leader"):
+        self.name = name
+
+    def try_acquire(self):
+        holder = self._holders.get(self.name)
+        if holder is None:
+            self._holders[self.name] = self
+            return True
+        return holder is self
+
+    def release(self):
+        if self._holders.get(self.name) is self:
+            del self._holders[self.name]
+
+
+class ClusterNode:
+    """Lider seçimi, anlık görüntü yayını ve abonelik parçası (shard) sahipliği"""
+
+    def __init__(self, bot, transport, lock, shard_index=0, shard_count=1, sync_interval=5, retry_interval=1):
+        self.bot = bot
+        self.transport = transport
+        self.lock = lock
+        self.shard_index = shard_index
+        self.shard_count = shard_count
+        self.sync_interval = sync_interval
+        self.retry_interval = retry_interval
+        self.is_leader = False
+        self.sequence = 0
+        self._published = None  # Liderin son yayınladığı randevuların özetleri
+        self._tasks = []
+
+    def owns(self, chat_id):
+        """Abonelik bu düğümün parçasında mı"""
+        return zlib.crc32(str(chat_id).encode()) % self.shard_count == self.shard_index
+
+    def start(self):
+        """Lider/işçi ve abonelik eşitleme görevlerini başlat"""
+        self._tasks = [
+            asyncio.create_task(self._role_loop()),
+            asyncio.create_task(self._sync_loop())
+        ]
+        logger.info(f"Küme düğümü başlatıldı: parça {self.shard_index + 1}/{self.shard_count}")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        await self.transport.close()
+        self.lock.release()
+        self.is_leader = False
+
+    async def _role_loop(self):
+        """Lider yoksa liderliği al, her durumda yayını işçi olarak dinle"""
+        leader_task = None
+        try:
+            while True:
+                if not self.is_leader and self.lock.try_acquire():
+                    self.is_leader = True
+                    logger.info("Bu düğüm lider seçildi, API kontrolü buradan yapılacak")
+                    await self.transport.start_publisher()
+                    leader_task = asyncio.create_task(self._lead())
+                try:
+                    async for message in self.transport.messages():
+                        self.bot.apply_cluster_message(message, self.owns)
+                except ConnectionError as e:
+                    logger.warning(f"Lider bağlantısı yok: {str(e)}")
+                    await asyncio.sleep(self.retry_interval * random.uniform(0.5, 1.5))
+        finally:
+            if leader_task is not None:
+                leader_task.cancel()
+
+    def _poll_interval(self, now):
+        """Tüm takipler içindeki en kısa kontrol aralığı (saniye), sıklaştırılan ülkeler dahil"""
+        intervals = [self.bot.scheduler.interval_for(subscription, now) for subscription in self.bot.registry]
+        if not intervals:
+            return None
+        return min(intervals)
+
+    def _boost_new(self, records, now):
+        """Yeni randevu çıkan ve takip edilen ülkeleri liderin zamanlayıcısında sıklaştır"""
+        current = {appointment_fingerprint(record): record for record in records}
+        if self._published is not None:
+            watched = {country for subscription in self.bot.registry for country in subscription.countries}
+            appeared = {record.mission for fingerprint, record in current.items() if fingerprint not in self._published}
+            for country in appeared & watched:
+                self.bot.scheduler.boost(country, now)
+        self._published = set(current)
+
+    async def _lead(self):
+        """API'yi çek ve sonucu tüm işçilere yayınla"""
+        scheduler = self.bot.scheduler
+        while True:
+            now = time.monotonic()
+            interval = self._poll_interval(now)
+            if interval is None:
+                await asyncio.sleep(self.sync_interval)
+                continue
+            if scheduler.can_fetch(now):
+                scheduler.record_fetch(now)
+                try:
+                    data = await self.bot.sources.fetch()
+                except CircuitOpen as e:
+                    # İstek yapılmadı, geri çekilmeyi devre kesici yönetiyor
+                    logger.debug(f"Lider API kontrolü atlandı: {str(e)}")
+                except Exception as e:
+                    delay = scheduler.record_error(time.monotonic())
+                    logger.error(f"Lider API hatası: {str(e)}, {delay:.0f} saniye geri çekiliniyor")
+                else:
+                    scheduler.record_success()
+                    self.sequence += 1
+                    if data is None:
+                        await self.transport.publish({"type": "unchanged", "seq": self.sequence})
+                    else:
+                        # Randevuyu işçi düğüm bulsa da sıklaştırma API'yi çeken liderde uygulanır
+                        self._boost_new(data, time.monotonic())
+                        await self.transport.publish({
+                            "type": "snapshot",
+                            "seq": self.sequence,
+                            "records": [record.astuple() for record in data]
+                        })
+            await asyncio.sleep(scheduler.wait_for(interval, time.monotonic()))
+
+    async def _sync_loop(self):
+        """Diğer süreçlerde eklenen veya silinen takipleri paylaşılan veritabanından al"""
+        registry = self.bot.registry
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                rows = await self.bot.storage.reload_subscriptions()
+            except Exception as e:
+                logger.error(f"Takipler eşitlenemedi: {str(e)}")
+                continue
+            stored = set()
+            for chat_id, countries, cities, frequency, filters in rows:
+                stored.add(chat_id)
+                subscription = registry.get(chat_id)
+                if (
+                    subscription is None
+                    or (subscription.countries, subscription.cities, subscription.filters_json)
+                    != (countries, cities, filters)
+                ):
+                    registry.add(chat_id, countries, cities, frequency, WatchFilter.from_json(filters))
+                elif subscription.frequency != frequency:
+                    subscription.frequency = frequency
+            now = datetime.now()
+            for subscription in registry:
+                # Henüz veritabanına yazılmamış yeni takipler silinmez
+                recent = (now - subscription.started_at).total_seconds() < self.sync_interval
+                if subscription.chat_id not in stored and not recent:
+                    registry.remove(subscription.chat_id)
@@ -0,0 +1,25 @@
+# Randevu listesi API adresi
+API_URL = "https://api.schengenvisaappointments.com/api/visa-list/?format=json"
+
+# Ülke ve şehir bilgileri
+COUNTRIES = {
+    'France': 'Fransa',
+    'Netherlands': 'Hollanda',
+    'Ireland': 'İrlanda',
+    'Malta': 'Malta',
+    'Sweden': 'İsveç',
+    'Czechia': 'Çekya',
+    'Croatia': 'Hırvatistan',
+    'Bulgaria': 'Bulgaristan',
+    'Finland': 'Finlandiya',
+    'Slovenia': 'Slovenya',
+    'Denmark': 'Danimarka',
+    'Norway': 'Norveç',
+    'Estonia': 'Estonya',
+    'Lithuania': 'Litvanya',
+    'Luxembourg': 'Lüksemburg',
+    'Ukraine': 'Ukrayna',
+    'Latvia': 'Letonya'
+}
+
+CITIES = ['Ankara', 'Istanbul', 'Izmir', 'Antalya', 'Gaziantep', 'Bursa', 'Edirne']
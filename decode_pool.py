@@ -0,0 +1,122 @@
+import sys
+import json
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from appointments import Appointment, SnapshotIndex
+from filters import WatchFilter
+from subscriptions import Subscription
+
+logger = logging.getLogger(__name__)
+
+
+def free_threaded():
+    """GIL'siz (free-threaded) Python derlemesi mi"""
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def decode_and_match(body, source_country, cities, watches, compact):
+    """Gövdeyi çöz, kayıtları dizinle ve takipleri eşleştir
+
+    compact=True ise (süreç havuzu) nesneler yerine kayıt demetleri ve sıra numaraları döndürülür.
+    """
+    records = [
+        Appointment.from_feed(entry) for entry in json.loads(body)
+        if isinstance(entry, dict) and (source_country is None or entry.get('source_country') == source_country)
+    ]
+    snapshot = SnapshotIndex(records, cities)
+    matches = {}
+    for key in watches:
+        countries, watch_cities, filters_json = key
+        filters = WatchFilter.from_json(filters_json) if filters_json else None
+        matches[key] = Subscription(None, countries, watch_cities, filters=filters).match(snapshot)
+    if not compact:
+        snapshot.matches = matches
+        return snapshot
+    # Süreçten yalnızca düz demetler ve sıra numaraları döner; tekrarlayan adlar pickle içinde bir kez yazılır
+    position = {id(record): i for i, record in enumerate(snapshot.records)}
+    groups = {key: [position[id(appt)] for appt in appointments] for key, appointments in snapshot.items()}
+    matches = {key: [position[id(appt)] for appt in found] for key, found in matches.items()}
+    return [record.astuple() for record in snapshot.records], groups, matches
+
+
+def rebuild_snapshot(result, cities):
+    """Süreç havuzunun demet çıktısından dizini yeniden kur (eşleştirme tekrarlanmaz)"""
+    rows, groups, matches = result
+    records = [Appointment.from_tuple(row) for row in rows]
+    snapshot = SnapshotIndex.from_groups(records, cities, groups)
+    snapshot.matches = {key: [records[i] for i in positions] for key, positions in matches.items()}
+    return snapshot
+
+
+class DecodedFeed(list):
+    """Havuzda çözümlenen kayıtlar; dizin ve takip eşleşmeleri hazır gelir"""
+
+    def __init__(self, snapshot):
+        super().__init__(snapshot.records)
+        self.snapshot = snapshot
+
+
+class DecodePool:
+    """Büyük yanıtların çözümleme, dizinleme ve eşleştirmesini olay döngüsü dışında yapan havuz
+
+    mode: "process", "thread", "auto" (GIL'siz derlemede thread, değilse process) veya "off".
+    """
+
+    def __init__(self, cities, watches, mode="auto", workers=2, threshold=2 * 1024 * 1024):
+        if mode == "auto":
+            mode = "thread" if free_threaded() else "process"
+        self.mode = mode
+        self.cities = tuple(cities)
+        self.watches = watches  # Güncel takip anahtarlarını döndüren fonksiyon
+        self.workers = workers
+        self.threshold = threshold
+        self._executor = None
+
+    @property
+    def enabled(self):
+        return self.mode in ("process", "thread")
+
+    def accepts(self, size):
+        """Bu boyuttaki gövde havuza gönderilsin mi"""
+        return self.enabled and size >= self.threshold
+
+    @property
+    def executor(self):
+        """Havuz ilk büyük yanıtta oluşturulur"""
+        if self._executor is None:
+            if self.mode == "process":
+                # spawn: çalışanlar ana sürecin iş parçacıklarını ve açık bağlantılarını devralmaz
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers, mp_context=multiprocessing.get_context("spawn")
+                )
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="decode")
+            logger.info(f"Çözümleme havuzu oluşturuldu ({self.mode}, {self.workers} çalışan)")
+        return self._executor
+
+    async def decode(self, body, source_country):
+        """Gövdeyi havuzda çöz, DecodedFeed döndür"""
+        loop = asyncio.get_running_loop()
+        compact = self.mode == "process"
+        try:
+            result = await loop.run_in_executor(
+                self.executor, decode_and_match, body, source_country, self.cities, list(self.watches()), compact
+            )
+        except BrokenProcessPool:
+            # Çöken çalışan sonraki turda yeni havuzla değiştirilir
+            logger.error("Çözümleme havuzundaki bir süreç beklenmedik şekilde sonlandı, havuz yeniden kurulacak")
+            self.close()
+            raise
+        if compact:
+            # Nesneler iş parçacığında kurulur; saf Python döngüsü GIL'i kısa aralıklarla bırakır
+            result = await loop.run_in_executor(None, rebuild_snapshot, result, self.cities)
+        return DecodedFeed(result)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,257 @@
+import json
+import time
+import hashlib
+import logging
+import aiohttp
+from collections import deque
+from feed_stream import RecordStream
+from tracing import add_span
+from metrics import DECODE_SECONDS, FETCH_SECONDS, NOT_MODIFIED, OFFLOADED_DECODES, POLLS, UNCHANGED
+
+try:
+    import brotli  # noqa: F401  aiohttp br sıkıştırmasını bu paketle çözer
+    ACCEPT_ENCODING = "gzip, deflate, br"
+except ImportError:
+    ACCEPT_ENCODING = "gzip, deflate"
+
+logger = logging.getLogger(__name__)
+
+
+def http_trace_config():
+    """DNS, bağlantı ve ilk bayta kadar geçen süreyi çalışan ize ekleyen aiohttp izleyicisi"""
+    config = aiohttp.TraceConfig()
+
+    async def on_request_start(session, context, params):
+        context.host = params.url.host
+        context.started = time.perf_counter()
+
+    async def on_dns_start(session, context, params):
+        context.dns_started = time.perf_counter()
+
+    async def on_dns_end(session, context, params):
+        add_span(f"dns:{params.host}", time.perf_counter() - context.dns_started)
+
+    async def on_connection_start(session, context, params):
+        context.connect_started = time.perf_counter()
+
+    async def on_connection_end(session, context, params):
+        add_span(f"connect:{context.host}", time.perf_counter() - context.connect_started)
+
+    async def on_request_end(session, context, params):
+        # Yanıt başlıkları alındığında çağrılır
+        add_span(f"ttfb:{context.host}", time.perf_counter() - context.started)
+
+    config.on_request_start.append(on_request_start)
+    config.on_dns_resolvehost_start.append(on_dns_start)
+    config.on_dns_resolvehost_end.append(on_dns_end)
+    config.on_connection_create_start.append(on_connection_start)
+    config.on_connection_create_end.append(on_connection_end)
+    config.on_request_end.append(on_request_end)
+    return config
+
+
+class FeedClient:
+    """Randevu akışı için uzun ömürlü, bağlantı havuzlu HTTP istemcisi"""
+
+    def __init__(self, url, connect_timeout=5, read_timeout=20, total_timeout=30,
+                 pool_size=10, dns_ttl=300, keepalive_timeout=75,
+                 streaming=True, source_country='Turkiye', chunk_size=64 * 1024, record_type=None,
+                 offload=None):
+        self.url = url
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.total_timeout = total_timeout
+        self.pool_size = pool_size
+        self.dns_ttl = dns_ttl
+        self.keepalive_timeout = keepalive_timeout
+        # Akışlı çözümlemede yalnızca bu kaynak ülkenin kayıtları tutulur
+        self.streaming = streaming
+        self.source_country = source_country
+        self.chunk_size = chunk_size
+        # Kayıtlar geldikçe bu türe çevrilir (ör. Appointment.from_feed)
+        self.record_type = record_type
+        # Content-Length eşiği aşan gövdeler bütün okunup çözümleme havuzuna gönderilir (DecodePool),
+        # boyutu bilinmeyen veya küçük gövdeler akışlı çözümlenir
+        self.offload = offload if offload is not None and offload.enabled else None
+        self._session = None
+        # Koşullu istek doğrulayıcıları ve son yanıtın özeti
+        self._etag = None
+        self._last_modified = None
+        self._body_digest = None
+
+    @property
+    def session(self):
+        """Paylaşılan oturum, ilk kullanımda oluşturulur"""
+        if self._session is None or self._session.closed:
+            # Bağlantılar ve DNS sonuçları kontroller arasında yeniden kullanılır
+            connector = aiohttp.TCPConnector(
+                limit=self.pool_size,
+                ttl_dns_cache=self.dns_ttl,
+                keepalive_timeout=self.keepalive_timeout
+            )
+            timeout = aiohttp.ClientTimeout(
+                total=self.total_timeout,
+                sock_connect=self.connect_timeout,
+                sock_read=self.read_timeout
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector, timeout=timeout, trace_configs=[http_trace_config()]
+            )
+            logger.info(f"HTTP istemcisi oluşturuldu (havuz: {self.pool_size}, DNS önbelleği: {self.dns_ttl} sn)")
+        return self._session
+
+    def conditional_headers(self):
+        """Koşullu istek başlıkları"""
+        headers = {"Accept-Encoding": ACCEPT_ENCODING}
+        if self._etag:
+            headers["If-None-Match"] = self._etag
+        if self._last_modified:
+            headers["If-Modified-Since"] = self._last_modified
+        return headers
+
+    async def fetch(self):
+        """Randevu listesini indir ve çözümle, değişmediyse None döndür"""
+        return self.commit(await self.request())
+
+    async def request(self):
+        """İsteği yap, istemci durumunu değiştirmeden (kayıtlar, etag, last_modified, özet) döndür
+
+        Aynı anda birden çok istek yapıldığında yalnızca kullanılan yanıt commit() ile saklanır.
+        """
+        POLLS.inc()
+        with FETCH_SECONDS.time():
+            return await self._fetch()
+
+    def commit(self, result):
+        """Kullanılan yanıtın doğrulayıcılarını ve özetini sakla, kayıtları döndür"""
+        data, etag, last_modified, digest = result
+        self._body_digest = digest
+        # Doğrulayıcılar yalnızca başarıyla çözümlenen yanıttan sonra saklanır
+        self._etag = etag
+        self._last_modified = last_modified
+        return data
+
+    async def _fetch(self):
+        async with self.session.get(self.url, headers=self.conditional_headers()) as response:
+            if response.status == 304:
+                NOT_MODIFIED.inc()
+                return None, self._etag, self._last_modified, self._body_digest
+            if response.status != 200:
+                raise aiohttp.ClientResponseError(
+                    response.request_info,
+                    response.history,
+                    status=response.status,
+                    message=f"API hatası: HTTP {response.status}"
+                )
+            etag = response.headers.get("ETag")
+            last_modified = response.headers.get("Last-Modified")
+            offload = self.offload is not None and self.offload.accepts(response.content_length or 0)
+            head = []
+            if not offload and self.offload is not None and self.offload.enabled:
+                # Content-Length sıkıştırılmış boyuttur; açılmış gövdenin eşiğe ulaşıp ulaşmadığı
+                # en fazla eşik kadar baştan okunarak anlaşılır
+                head = await self._peek(response, self.offload.threshold)
+                offload = sum(len(chunk) for chunk in head) >= self.offload.threshold
+            if offload:
+                digest, body = await self._read_body(response, head)
+                data = None
+            elif self.streaming:
+                # Doğrulayıcı göndermeyen sunucuda değişmeyen gövde çözümlenmeden atlanır
+                validated = etag is not None or last_modified is not None
+                digest, data = await self._read_stream(response, None if validated else self._body_digest, head)
+            else:
+                digest, body = await self._read_body(response, head)
+                data = None
+
+        # Sunucu doğrulayıcı desteklemiyorsa gövde özetiyle karşılaştır
+        if digest == self._body_digest:
+            UNCHANGED.inc()
+            data = None
+        elif data is None and self.offload is not None and self.offload.accepts(len(body)):
+            start = time.perf_counter()
+            OFFLOADED_DECODES.inc()
+            data = await self.offload.decode(body, self.source_country)
+            DECODE_SECONDS.observe(time.perf_counter() - start)
+            add_span("decode:pool", time.perf_counter() - start)
+        elif data is None:
+            start = time.perf_counter()
+            with DECODE_SECONDS.time():
+                data = json.loads(body)
+                if self.record_type is not None:
+                    data = [self.record_type(entry) for entry in data]
+            add_span("decode", time.perf_counter() - start)
+        return data, etag, last_modified, digest
+
+    async def _peek(self, response, limit):
+        """Gövdenin başından en az limit bayt (gövde daha kısaysa tamamını) oku"""
+        head = []
+        size = 0
+        async for chunk in response.content.iter_chunked(self.chunk_size):
+            head.append(chunk)
+            size += len(chunk)
+            if size >= limit:
+                break
+        return head
+
+    async def _chunks(self, response, head=()):
+        """Önceden okunan parçalar ve gövdenin kalanı"""
+        for chunk in head:
+            yield chunk
+        async for chunk in response.content.iter_chunked(self.chunk_size):
+            yield chunk
+
+    async def _read_body(self, response, head=()):
+        """Gövdeyi parça parça oku ve özetle; büyük gövdenin özeti olay döngüsünü tek seferde bekletmez"""
+        hasher = hashlib.blake2b(digest_size=16)
+        chunks = []
+        async for chunk in self._chunks(response, head):
+            hasher.update(chunk)
+            chunks.append(chunk)
+        return hasher.digest(), b"".join(chunks)
+
+    async def _read_stream(self, response, previous_digest=None, head=()):
+        """Gövdeyi parça parça oku, özeti ve kayıtları birlikte çıkar
+
+        previous_digest verilirse parçalar önce yalnızca özetlenir; gövde bu özetle aynıysa
+        çözümleme yapılmaz ve kayıtlar yerine None döner.
+        """
+        hasher = hashlib.blake2b(digest_size=16)
+        stream = RecordStream(self.source_country)
+        records = []
+        decode_seconds = 0.0
+
+        def decode(chunk):
+            nonlocal decode_seconds
+            start = time.perf_counter()
+            entries = stream.feed(chunk)
+            if self.record_type is not None:
+                entries = [self.record_type(entry) for entry in entries]
+            records.extend(entries)
+            decode_seconds += time.perf_counter() - start
+
+        pending = deque() if previous_digest is not None else None
+        async for chunk in self._chunks(response, head):
+            hasher.update(chunk)
+            if pending is None:
+                decode(chunk)
+            else:
+                pending.append(chunk)
+        digest = hasher.digest()
+        if pending is not None:
+            if digest == previous_digest:
+                return digest, None
+            while pending:
+                decode(pending.popleft())
+        stream.close()
+        DECODE_SECONDS.observe(decode_seconds)
+        add_span("decode", decode_seconds)
+        if stream.skipped:
+            logger.debug(f"Akışta {stream.skipped} kayıt kaynak ülke nedeniyle atlandı")
+        return digest, records
+
+    async def close(self):
+        """Oturumu ve havuzdaki bağlantıları kapat"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            logger.info("HTTP istemcisi kapatıldı")
+        self._session = None
@@ -0,0 +1,125 @@
+import re
+import json
+import codecs
+
+# Nesne sınırlarını bulmak için yalnızca süslü parantez ve tırnaklara bakılır
+STRUCTURE = re.compile(r'[{}"]')
+STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"')
+SOURCE_COUNTRY = re.compile(r'"source_country"\s*:\s*"([^"\\]*)"')
+WHITESPACE = ' \t\r\n'
+
+
+class RecordStream:
+    """Parçalar halinde gelen JSON dizisini kayıt kayıt ayrıştırır"""
+
+    def __init__(self, source_country=None):
+        self.source_country = source_country
+        self.skipped = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._buffer = ''
+        self._pos = 0
+        self._started = False
+        self._finished = False
+        self._object_start = None
+        self._depth = 0
+        self._in_string = False
+
+    def feed(self, chunk):
+        """Yeni bayt parçasını ekle, tamamlanan kayıtları döndür"""
+        self._buffer += self._decoder.decode(chunk)
+        records = []
+        while not self._finished:
+            record = self._next_record()
+            if record is None:
+                break
+            if record is not False:
+                records.append(record)
+
+        # İşlenen kısmı tampondan at
+        start = self._pos if self._object_start is None else self._object_start
+        if start:
+            self._buffer = self._buffer[start:]
+            self._pos -= start
+            if self._object_start is not None:
+                self._object_start = 0
+        return records
+
+    def close(self):
+        """Akışın eksiksiz bittiğini doğrula"""
+        self._buffer += self._decoder.decode(b'', final=True)
+        if not self._finished:
+            raise json.JSONDecodeError("JSON dizisi tamamlanmadı", self._buffer, self._pos)
+
+    def _skip(self, characters):
+        buffer = self._buffer
+        while self._pos < len(buffer) and buffer[self._pos] in characters:
+            self._pos += 1
+        return self._pos < len(buffer)
+
+    def _next_record(self):
+        """Sıradaki kaydı döndür; veri yetmezse None, kayıt elendiyse False"""
+        buffer = self._buffer
+        if not self._started:
+            if not self._skip(WHITESPACE):
+                return None
+            if buffer[self._pos] != '[':
+                raise json.JSONDecodeError("JSON dizisi bekleniyordu", buffer, self._pos)
+            self._pos += 1
+            self._started = True
+
+        if self._object_start is None:
+            if not self._skip(WHITESPACE + ','):
+                return None
+            char = buffer[self._pos]
+            if char == ']':
+                self._pos += 1
+                self._finished = True
+                return None
+            if char != '{':
+                raise json.JSONDecodeError("JSON nesnesi bekleniyordu", buffer, self._pos)
+            self._object_start = self._pos
+            self._depth = 0
+
+            # Hızlı yol: iç içe nesne ve kaçış karakteri içermeyen düz kayıt
+            end = buffer.find('}', self._pos)
+            if end != -1:
+                text = buffer[self._pos:end + 1]
+                if '{' not in text[1:] and '\\' not in text and text.count('"') % 2 == 0:
+                    self._pos = end + 1
+                    self._object_start = None
+                    return self._decode(text)
+
+        while True:
+            if self._in_string:
+                match = STRING_END.match(buffer, self._pos)
+                if match is None:
+                    return None
+                self._pos = match.end()
+                self._in_string = False
+                continue
+
+            match = STRUCTURE.search(buffer, self._pos)
+            if match is None:
+                self._pos = len(buffer)
+                return None
+            self._pos = match.end()
+            char = match.group()
+            if char == '"':
+                self._in_string = True
+            elif char == '{':
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    text = buffer[self._object_start:self._pos]
+                    self._object_start = None
+                    return self._decode(text)
+
+    def _decode(self, text):
+        # Kaynak ülkesi uymayan kayıtlar sözlüğe çevrilmeden elenir
+        if self.source_country is not None:
+            match = SOURCE_COUNTRY.search(text)
+            if match is not None and match.group(1) != self.source_country:
+                self.skipped += 1
+                return False
+        return json.loads(text)
@@ -0,0 +1,201 @@
+import json
+from datetime import date, timedelta
+from functools import lru_cache
+
+ALL_WEEKDAYS = 0b1111111  # Pazartesi 0. bit, Pazar 6. bit
+
+WEEKDAY_NAMES = ['pzt', 'sal', 'çar', 'per', 'cum', 'cmt', 'paz']
+WEEKDAY_ALIASES = {
+    'car': 0b0000100,
+    'haftaici': 0b0011111,
+    'hafta-içi': 0b0011111,
+    'haftasonu': 0b1100000,
+    'hafta-sonu': 0b1100000
+}
+
+CATEGORY_KEYS = ('kategori', 'category')
+DATE_KEYS = ('tarih', 'date')
+WEEKDAY_KEYS = ('gün', 'gun', 'days')
+
+
+@lru_cache(maxsize=1024)
+def fold(text):
+    """Büyük/küçük harf ve i/ı/İ farkını yok sayan karşılaştırma anahtarı"""
+    return text.replace('İ', 'i').replace('I', 'i').replace('ı', 'i').lower()
+
+
+def weekday_mask(names):
+    """Gün adlarını (pzt, sal, ..., haftaici) bit maskesine çevir"""
+    mask = 0
+    for name in names:
+        key = fold(name.strip())
+        if not key:
+            continue
+        if key in WEEKDAY_ALIASES:
+            mask |= WEEKDAY_ALIASES[key]
+        elif key in WEEKDAY_NAMES:
+            mask |= 1 << WEEKDAY_NAMES.index(key)
+        else:
+            raise ValueError(f"Geçersiz gün: {name} (pzt, sal, çar, per, cum, cmt, paz, haftaici, haftasonu)")
+    return mask or ALL_WEEKDAYS
+
+
+def describe_weekdays(mask):
+    return ", ".join(name for i, name in enumerate(WEEKDAY_NAMES) if mask >> i & 1)
+
+
+class WatchFilter:
+    """Aboneliğin kategori, tarih aralığı ve haftanın günü koşulları
+
+    days_ahead verilirse aralık sabit tarihler yerine eşleştirme günü ile N gün sonrası arasıdır.
+    """
+
+    def __init__(self, categories=(), earliest=None, latest=None, weekdays=ALL_WEEKDAYS, days_ahead=None):
+        self.categories = tuple(categories)
+        self.earliest = earliest
+        self.latest = latest
+        self.weekdays = weekdays
+        self.days_ahead = days_ahead
+
+    def __bool__(self):
+        return bool(
+            self.categories or self.earliest or self.latest or self.days_ahead or self.weekdays != ALL_WEEKDAYS
+        )
+
+    def compile(self):
+        """Koşulları tek seferde randevu başına sabit maliyetli bir fonksiyona çevir, koşul yoksa None"""
+        checks = []
+        if self.categories:
+            allowed = frozenset(fold(category) for category in self.categories)
+            checks.append(lambda appt: fold(appt.category) in allowed)
+        if self.earliest or self.latest or self.days_ahead or self.weekdays != ALL_WEEKDAYS:
+            earliest = self.earliest or date.min
+            latest = self.latest or date.max
+            ahead = timedelta(days=self.days_ahead) if self.days_ahead else None
+            mask = self.weekdays
+
+            def in_window(appt):
+                day = appt.day
+                if day is None:
+                    return False
+                if ahead is not None:
+                    # Göreli aralık her eşleştirmede bugünden hesaplanır, takip günler geçtikçe daralmaz
+                    today = date.today()
+                    if not today <= day <= today + ahead:
+                        return False
+                return earliest <= day <= latest and mask >> day.weekday() & 1
+
+            checks.append(in_window)
+        if not checks:
+            return None
+        if len(checks) == 1:
+            return checks[0]
+        category_check, window_check = checks
+        return lambda appt: category_check(appt) and window_check(appt)
+
+    def describe(self):
+        """Durum mesajları için okunur satırlar"""
+        lines = []
+        if self.categories:
+            lines.append(f"📋 Kategori: {', '.join(self.categories)}")
+        if self.earliest or self.latest:
+            earliest = self.earliest.strftime('%d.%m.%Y') if self.earliest else '...'
+            latest = self.latest.strftime('%d.%m.%Y') if self.latest else '...'
+            lines.append(f"📅 Tarih Aralığı: {earliest} - {latest}")
+        if self.days_ahead:
+            lines.append(f"📅 Tarih Aralığı: önümüzdeki {self.days_ahead} gün")
+        if self.weekdays != ALL_WEEKDAYS:
+            lines.append(f"🗓 Günler: {describe_weekdays(self.weekdays)}")
+        return lines
+
+    def to_json(self):
+        return json.dumps({
+            "categories": list(self.categories),
+            "earliest": self.earliest.isoformat() if self.earliest else None,
+            "latest": self.latest.isoformat() if self.latest else None,
+            "days_ahead": self.days_ahead,
+            "weekdays": self.weekdays
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, text):
+        """Saklanan koşulları yükle, boşsa None"""
+        if not text:
+            return None
+        data = json.loads(text)
+        return cls(
+            data.get("categories", ()),
+            date.fromisoformat(data["earliest"]) if data.get("earliest") else None,
+            date.fromisoformat(data["latest"]) if data.get("latest") else None,
+            data.get("weekdays", ALL_WEEKDAYS),
+            data.get("days_ahead")
+        ) or None
+
+
+def parse_date_window(text):
+    """2025-06-01..2025-07-15 biçimindeki aralığı çözümle, uçlar boş bırakılabilir"""
+    start, separator, end = text.partition('..')
+    try:
+        earliest = date.fromisoformat(start) if start else None
+        latest = date.fromisoformat(end) if end else None
+        if not separator:
+            # Tek tarih verilirse yalnızca o gün
+            latest = earliest
+    except ValueError:
+        raise ValueError(f"Geçersiz tarih aralığı: {text} (ör. 2025-06-01..2025-07-15)")
+    if earliest and latest and earliest > latest:
+        raise ValueError(f"Tarih aralığının başı sonundan büyük: {text}")
+    return earliest, latest
+
+
+def _lookup(names, value, choices):
+    key = fold(value)
+    for canonical in choices:
+        if key in names.get(canonical, ()):
+            return canonical
+    return None
+
+
+def parse_check_args(args, countries, cities):
+    """/check argümanlarını (ülkeler, şehirler, WatchFilter) olarak çözümle
+
+    /check Fransa,Hollanda Istanbul,Ankara kategori=Tourism tarih=2025-06-01..2025-07-15 gün=pzt,cum
+    """
+    if len(args) < 2:
+        raise ValueError("Ülke ve şehir belirtilmeli")
+    country_names = {eng: (fold(eng), fold(tr)) for eng, tr in countries.items()}
+    city_names = {city: (fold(city),) for city in cities}
+
+    selected_countries = []
+    for value in args[0].split(','):
+        country = _lookup(country_names, value.strip(), countries)
+        if country is None:
+            raise ValueError(f"Geçersiz ülke: {value}")
+        if country not in selected_countries:
+            selected_countries.append(country)
+    selected_cities = []
+    for value in args[1].split(','):
+        city = _lookup(city_names, value.strip(), cities)
+        if city is None:
+            raise ValueError(f"Geçersiz şehir: {value}")
+        if city not in selected_cities:
+            selected_cities.append(city)
+
+    categories = ()
+    earliest = latest = None
+    weekdays = ALL_WEEKDAYS
+    for option in args[2:]:
+        key, separator, value = option.partition('=')
+        key = fold(key)
+        if not separator or not value:
+            raise ValueError(f"Geçersiz seçenek: {option} (ör. kategori=Tourism)")
+        if key in CATEGORY_KEYS:
+            categories = tuple(category.strip() for category in value.split(',') if category.strip())
+        elif key in DATE_KEYS:
+            earliest, latest = parse_date_window(value)
+        elif key in WEEKDAY_KEYS:
+            weekdays = weekday_mask(value.split(','))
+        else:
+            raise ValueError(f"Bilinmeyen seçenek: {key} (kategori, tarih, gün)")
+
+    return tuple(selected_countries), tuple(selected_cities), WatchFilter(categories, earliest, latest, weekdays) or None
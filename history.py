@@ -0,0 +1,259 @@
+import os
+import gzip
+import json
+import time
+import sqlite3
+import asyncio
+import logging
+from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from appointments import appointment_fingerprint, tr_timezone
+
+logger = logging.getLogger(__name__)
+
+# Randevu ömrü dilimleri (saniye); son dilim daha uzun süreleri kapsar, -1 hâlâ açık randevular
+LIFETIME_BUCKETS = (60, 300, 900, 3600, 4 * 3600, 12 * 3600, 24 * 3600, 3 * 24 * 3600)
+LIFETIME_LABELS = ('1 dk', '5 dk', '15 dk', '1 sa', '4 sa', '12 sa', '1 gün', '3 gün')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS slots (
+    id INTEGER PRIMARY KEY,
+    fingerprint TEXT NOT NULL,
+    mission TEXT NOT NULL,
+    city TEXT NOT NULL,
+    category TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    appeared_at REAL NOT NULL,
+    gone_at REAL
+);
+CREATE INDEX IF NOT EXISTS slots_by_place ON slots (mission, city, appeared_at);
+-- Randevu listeden çıkıp geri gelirse yeni satır açılır; açık satır randevu başına tektir
+CREATE UNIQUE INDEX IF NOT EXISTS slots_open_fingerprint ON slots (fingerprint) WHERE gone_at IS NULL;
+CREATE TABLE IF NOT EXISTS rollup (
+    mission TEXT NOT NULL,
+    city TEXT NOT NULL,
+    category TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    bucket INTEGER NOT NULL,
+    count INTEGER NOT NULL,
+    lifetime_sum REAL NOT NULL,
+    PRIMARY KEY (mission, city, category, hour, bucket)
+) WITHOUT ROWID;
+"""
+
+# Ham satırları özet tablosuyla aynı dilimlere ayıran ifade
+BUCKET_SQL = "CASE WHEN gone_at IS NULL THEN -1 " + " ".join(
+    f"WHEN gone_at - appeared_at < {limit} THEN {i}" for i, limit in enumerate(LIFETIME_BUCKETS)
+) + f" ELSE {len(LIFETIME_BUCKETS)} END"
+
+AGGREGATE_SQL = f"""
+SELECT category, hour, {BUCKET_SQL} AS bucket, COUNT(*), COALESCE(SUM(gone_at - appeared_at), 0)
+FROM slots WHERE mission = ? AND city = ? GROUP BY category, hour, bucket
+"""
+
+
+def release_hour(timestamp):
+    """Türkiye saatine göre listeye giriş saati"""
+    return datetime.fromtimestamp(timestamp, tr_timezone()).hour
+
+
+class HistoryStore:
+    """Randevuların listeye giriş ve çıkışlarını saklayan, eski kayıtları özetleyip arşivleyen kayıt"""
+
+    def __init__(self, path, retention_days=30, flush_interval=5.0, rotate_interval=3600):
+        self.path = path
+        self.retention = retention_days * 24 * 3600
+        self.flush_interval = flush_interval
+        self.rotate_interval = rotate_interval
+        self._conn = None
+        # Fark hesaplama ve yazma olay döngüsü dışında tek bir iş parçacığında yapılır
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="history")
+        self._open = set()  # Listede olan randevuların özetleri
+        self._pending = None  # Henüz işlenmemiş son anlık görüntü
+        self._task = None
+
+    def open(self):
+        """Veritabanını aç ve listede olan randevuları yükle"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self._conn.commit()
+        self._open = {
+            fingerprint for (fingerprint,) in self._conn.execute("SELECT fingerprint FROM slots WHERE gone_at IS NULL")
+        }
+        logger.info(f"Geçmiş veritabanı açıldı: {self.path} ({len(self._open)} açık randevu)")
+
+    def record(self, snapshot):
+        """Yeni anlık görüntüyü sıraya al, arada gelenler birleştirilir"""
+        self._pending = (snapshot, time.time())
+
+    def start(self):
+        """Toplu yazma ve döndürme görevini başlat"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._loop())
+
+    async def _loop(self):
+        last_rotate = time.monotonic()
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+                if time.monotonic() - last_rotate >= self.rotate_interval:
+                    last_rotate = time.monotonic()
+                    await asyncio.get_running_loop().run_in_executor(self._executor, self._rotate, time.time())
+            except (sqlite3.Error, OSError) as e:
+                logger.error(f"Geçmiş yazma hatası: {str(e)}")
+
+    async def flush(self):
+        """Bekleyen anlık görüntünün farkını yaz"""
+        if self._pending is None:
+            return
+        snapshot, now = self._pending
+        self._pending = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._write, snapshot, now)
+
+    def _write(self, snapshot, now):
+        current = {}
+        for mission, city, appointments in snapshot.groups():
+            for appt in appointments:
+                fingerprint = appointment_fingerprint(appt)
+                if fingerprint not in current:
+                    current[fingerprint] = (mission, city, appt.category)
+        hour = release_hour(now)
+        appeared = [
+            (fingerprint, mission, city, category, hour, now)
+            for fingerprint, (mission, city, category) in current.items()
+            if fingerprint not in self._open
+        ]
+        gone = [(now, fingerprint) for fingerprint in self._open if fingerprint not in current]
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO slots (fingerprint, mission, city, category, hour, appeared_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                appeared
+            )
+            self._conn.executemany("UPDATE slots SET gone_at = ? WHERE fingerprint = ? AND gone_at IS NULL", gone)
+        self._open = set(current)
+        if appeared or gone:
+            logger.debug(f"Geçmiş: {len(appeared)} yeni, {len(gone)} kapanan randevu")
+
+    def _rotate(self, now):
+        """Saklama süresini aşan kapanmış kayıtları özet tabloya ekle, ham halini sıkıştırıp arşivle"""
+        cutoff = now - self.retention
+        rows = self._conn.execute(
+            "SELECT fingerprint, mission, city, category, hour, appeared_at, gone_at FROM slots "
+            "WHERE gone_at IS NOT NULL AND appeared_at < ?",
+            (cutoff,)
+        ).fetchall()
+        if not rows:
+            return
+        archive_path = f"{os.path.splitext(self.path)[0]}-{datetime.fromtimestamp(now).strftime('%Y%m%d%H%M')}.jsonl.gz"
+        with gzip.open(archive_path, "wt", encoding="utf-8") as archive:
+            for row in rows:
+                archive.write(json.dumps(row, ensure_ascii=False) + "\n")
+        with self._conn:
+            self._conn.execute(
+                f"INSERT INTO rollup (mission, city, category, hour, bucket, count, lifetime_sum) "
+                f"SELECT mission, city, category, hour, {BUCKET_SQL} AS bucket, COUNT(*), SUM(gone_at - appeared_at) "
+                f"FROM slots WHERE gone_at IS NOT NULL AND appeared_at < ? "
+                f"GROUP BY mission, city, category, hour, bucket "
+                f"ON CONFLICT (mission, city, category, hour, bucket) DO UPDATE SET "
+                f"count = count + excluded.count, lifetime_sum = lifetime_sum + excluded.lifetime_sum",
+                (cutoff,)
+            )
+            self._conn.execute("DELETE FROM slots WHERE gone_at IS NOT NULL AND appeared_at < ?", (cutoff,))
+        logger.info(f"Geçmiş döndürüldü: {len(rows)} kayıt özetlendi ve {archive_path} dosyasına arşivlendi")
+
+    def _aggregate(self, mission, city):
+        rows = self._conn.execute(AGGREGATE_SQL, (mission, city)).fetchall()
+        rows += self._conn.execute(
+            "SELECT category, hour, bucket, count, lifetime_sum FROM rollup WHERE mission = ? AND city = ?",
+            (mission, city)
+        ).fetchall()
+        return rows
+
+    async def stats(self, mission, city):
+        """Ülke ve şehir için özet istatistikler"""
+        await self.flush()
+        rows = await asyncio.get_running_loop().run_in_executor(self._executor, self._aggregate, mission, city)
+        return HistoryStats(rows)
+
+    async def close(self):
+        """Bekleyen yazmaları tamamla ve veritabanını kapat"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._conn is not None:
+            await self.flush()
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+        self._executor.shutdown(wait=True)
+
+
+class HistoryStats:
+    """(kategori, saat, ömür dilimi, sayı, toplam ömür) satırlarından özet"""
+
+    def __init__(self, rows):
+        self.releases = 0
+        self.hours = [0] * 24
+        self.categories = {}
+        self.buckets = [0] * (len(LIFETIME_BUCKETS) + 1)
+        self.open = 0
+        self.lifetime_sum = 0.0
+        for category, hour, bucket, count, lifetime_sum in rows:
+            self.releases += count
+            self.hours[hour] += count
+            self.categories[category] = self.categories.get(category, 0) + count
+            if bucket < 0:
+                self.open += count
+            else:
+                self.buckets[bucket] += count
+                self.lifetime_sum += lifetime_sum
+
+    @property
+    def closed(self):
+        return self.releases - self.open
+
+    def taken_within(self, index):
+        """Kapanan randevuların verilen dilim sınırından önce kapananlarının oranı"""
+        if not self.closed:
+            return 0.0
+        return sum(self.buckets[:index + 1]) / self.closed
+
+    def format(self, title):
+        """Telegram mesajı"""
+        if not self.releases:
+            return f"📊 {title}\n\nHenüz kayıtlı randevu geçmişi yok."
+        lines = [f"📊 {title}", "", f"🆕 Listeye giren randevu: {self.releases}"]
+        top_hours = sorted(range(24), key=lambda hour: self.hours[hour], reverse=True)[:3]
+        lines.append("🕐 En çok açılan saatler: " + ", ".join(
+            f"{hour:02d}:00 (%{self.hours[hour] * 100 // self.releases})" for hour in top_hours if self.hours[hour]
+        ))
+        if self.closed:
+            average = self.lifetime_sum / self.closed
+            lines.append(f"⏳ Ortalama listede kalma süresi: {format_duration(average)}")
+            lines.append("⚡ Alınma oranı: " + ", ".join(
+                f"{LIFETIME_LABELS[i]} içinde %{round(self.taken_within(i) * 100)}" for i in (1, 3, 6)
+            ))
+        if self.open:
+            lines.append(f"📌 Hâlâ listede: {self.open}")
+        categories = sorted(self.categories.items(), key=lambda item: item[1], reverse=True)[:5]
+        lines.append("📋 Kategoriler: " + ", ".join(
+            f"{category} %{count * 100 // self.releases}" for category, count in categories
+        ))
+        return "\n".join(lines)
+
+
+def format_duration(seconds):
+    if seconds < 60:
+        return f"{seconds:.0f} sn"
+    if seconds < 3600:
+        return f"{seconds / 60:.0f} dk"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f} sa"
+    return f"{seconds / 86400:.1f} gün"
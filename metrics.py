@@ -0,0 +1,194 @@
+import time
+import bisect
+import logging
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+class Counter:
+    """Yalnızca artan sayaç"""
+
+    kind = "counter"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def samples(self):
+        yield self.name, self.value
+
+
+class Gauge:
+    """Anlık değer, okunurken fonksiyondan alınabilir"""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation):
+        self.name = name
+        self.documentation = documentation
+        self.value = 0
+        self._function = None
+
+    def set(self, value):
+        self.value = value
+
+    def set_function(self, function):
+        """Değeri her okumada verilen fonksiyondan al"""
+        self._function = function
+
+    def samples(self):
+        value = self.value
+        if self._function is not None:
+            try:
+                value = self._function()
+            except Exception as e:
+                logger.warning(f"Metrik okunamadı ({self.name}): {str(e)}")
+        yield self.name, value
+
+
+class Histogram:
+    """Süre dağılımı"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets=DEFAULT_BUCKETS, labels=""):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels  # ör. 'kind="freq",'
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    @contextmanager
+    def time(self):
+        """Bloğun süresini ölç"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def samples(self):
+        cumulative = 0
+        for bound, count in zip(self.buckets, self.counts):
+            cumulative += count
+            yield f'{self.name}_bucket{{{self.labels}le="{bound}"}}', cumulative
+        yield f'{self.name}_bucket{{{self.labels}le="+Inf"}}', self.count
+        suffix = f"{{{self.labels.rstrip(',')}}}" if self.labels else ""
+        yield f"{self.name}_sum{suffix}", self.sum
+        yield f"{self.name}_count{suffix}", self.count
+
+
+class HistogramFamily:
+    """Tek etiketle ayrılan süre dağılımları"""
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, label, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.label = label
+        self.buckets = buckets
+        self._children = {}
+
+    def labels(self, value):
+        """Etiket değerinin dağılımı, ilk kullanımda oluşturulur"""
+        child = self._children.get(value)
+        if child is None:
+            child = Histogram(self.name, self.documentation, self.buckets, f'{self.label}="{value}",')
+            self._children[value] = child
+        return child
+
+    def samples(self):
+        for child in list(self._children.values()):
+            yield from child.samples()
+
+
+class Registry:
+    """Metrikleri Prometheus metin biçiminde sunar"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, documentation):
+        return self.register(Counter(name, documentation))
+
+    def gauge(self, name, documentation):
+        return self.register(Gauge(name, documentation))
+
+    def histogram(self, name, documentation, buckets=DEFAULT_BUCKETS):
+        return self.register(Histogram(name, documentation, buckets))
+
+    def histogram_family(self, name, documentation, label, buckets=DEFAULT_BUCKETS):
+        return self.register(HistogramFamily(name, documentation, label, buckets))
+
+    def render(self):
+        """Prometheus metin biçimi (0.0.4)"""
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, value in metric.samples():
+                lines.append(f"{name} {value}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+FETCH_SECONDS = REGISTRY.histogram("visa_fetch_seconds", "API isteğinin toplam süresi")
+DECODE_SECONDS = REGISTRY.histogram("visa_decode_seconds", "API yanıtının JSON çözümleme süresi")
+OFFLOADED_DECODES = REGISTRY.counter("visa_offloaded_decodes_total", "Çözümleme havuzuna gönderilen yanıt sayısı")
+FILTER_SECONDS = REGISTRY.histogram("visa_filter_seconds", "Dizin oluşturma ve tüm aboneliklerin eşleştirme süresi")
+SEND_SECONDS = REGISTRY.histogram("telegram_send_seconds", "Tek Telegram mesajının gönderim süresi")
+CALLBACK_SECONDS = REGISTRY.histogram_family(
+    "telegram_callback_seconds", "Buton callback işleyicisinin süresi (tür başına)", "kind"
+)
+
+POLLS = REGISTRY.counter("visa_polls_total", "API'ye yapılan istek sayısı")
+NOT_MODIFIED = REGISTRY.counter("visa_not_modified_total", "304 Not Modified yanıtı sayısı")
+UNCHANGED = REGISTRY.counter("visa_unchanged_total", "Gövde özeti değişmeyen yanıt sayısı")
+HTTP_ERRORS = REGISTRY.counter("visa_http_errors_total", "Hatalı API isteği sayısı")
+HEDGED_REQUESTS = REGISTRY.counter("visa_hedged_requests_total", "Yavaş yanıt nedeniyle gönderilen ikinci istek sayısı")
+CIRCUIT_OPENS = REGISTRY.counter("visa_circuit_opens_total", "Kaynak devre kesicisinin açılma sayısı")
+SOURCE_ERRORS = REGISTRY.counter("visa_source_errors_total", "Kaynak başına hatalı veya zaman aşımına uğrayan istek sayısı")
+MATCHES = REGISTRY.counter("visa_matches_total", "Bildirilen yeni randevu sayısı")
+MESSAGES_SENT = REGISTRY.counter("telegram_messages_sent_total", "Gönderilen Telegram mesajı sayısı")
+
+ACTIVE_SUBSCRIPTIONS = REGISTRY.gauge("visa_active_subscriptions", "Aktif takip sayısı")
+QUEUE_DEPTH = REGISTRY.gauge("telegram_queue_depth", "Gönderim kuyruğunda bekleyen mesaj sayısı")
+
+
+async def start_metrics_server(host, port):
+    """/metrics uç noktasını başlat, kapatmak için runner döndür"""
+    from aiohttp import web
+
+    async def handle(request):
+        return web.Response(body=REGISTRY.render().encode(), headers={
+            "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+            "Cache-Control": "no-cache"
+        })
+
+    app = web.Application()
+    app.router.add_get("/metrics", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info(f"Metrik uç noktası başlatıldı: http://{host}:{port}/metrics")
+    return runner
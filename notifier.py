@@ -0,0 +1,163 @@
+import time
+import asyncio
+import logging
+from collections import deque
+from telegram.error import RetryAfter
+from metrics import MESSAGES_SENT, SEND_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Telegram tek mesajda en fazla 4096 karakter kabul eder
+MAX_MESSAGE_LENGTH = 4096
+DIGEST_SEPARATOR = "\n\n➖➖➖➖➖\n\n"
+
+
+class TokenBucket:
+    """Saniyede belirli sayıda işleme izin veren jeton kovası"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def reserve(self):
+        """Bir jeton ayır, jetonun hazır olmasına kalan süreyi döndür"""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        if self.tokens >= 0:
+            return 0.0
+        return -self.tokens / self.rate
+
+    def is_full(self):
+        """Kova dolu mu (uzun süredir kullanılmıyor)"""
+        now = time.monotonic()
+        return self.tokens + (now - self.updated) * self.rate >= self.capacity
+
+
+class Notifier:
+    """Hız sınırlı, sohbet başına birleştiren giden mesaj kuyruğu"""
+
+    def __init__(self, send, global_rate=25, chat_rate=1, chat_burst=3,
+                 workers=4, max_pending_per_chat=50, max_retries=3):
+        self.send_message = send
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.workers = workers
+        self.max_pending_per_chat = max_pending_per_chat
+        self.max_retries = max_retries
+        self.sent_count = 0
+        self._chat_buckets = {}
+        self._pending = {}  # sohbet -> bekleyen mesaj metinleri
+        self._in_flight = set()
+        self._ready = asyncio.Queue()
+        self._paused_until = 0.0
+        self._tasks = []
+
+    @property
+    def depth(self):
+        """Kuyrukta bekleyen mesaj sayısı"""
+        return sum(len(texts) for texts in self._pending.values())
+
+    def start(self):
+        """Gönderim görevlerini başlat"""
+        if not self._tasks:
+            self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+            logger.info(f"Mesaj kuyruğu başlatıldı ({self.workers} gönderici)")
+
+    async def stop(self, timeout=5):
+        """Bekleyen mesajları kısa süre gönder, sonra görevleri durdur"""
+        deadline = time.monotonic() + timeout
+        while (self._pending or self._in_flight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        if self._pending:
+            logger.warning(f"Kapatılırken {self.depth} mesaj gönderilemedi")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def send(self, chat_id, text):
+        """Mesajı kuyruğa ekle, gönderimi beklemeden dön"""
+        texts = self._pending.setdefault(chat_id, deque())
+        if len(texts) >= self.max_pending_per_chat:
+            texts.popleft()
+            logger.warning(f"Mesaj kuyruğu dolu, en eski mesaj atıldı - Sohbet: {chat_id}")
+        texts.append(text)
+        # Aynı sohbet kuyrukta veya gönderimdeyse tekrar eklenmez, mesajlar birleştirilir
+        if chat_id not in self._in_flight and len(texts) == 1:
+            self._ready.put_nowait(chat_id)
+
+    def _take_digest(self, chat_id):
+        """Sohbetin bekleyen mesajlarını tek mesajda birleştir"""
+        texts = self._pending.get(chat_id)
+        parts = []
+        length = 0
+        while texts:
+            extra = len(texts[0]) + (len(DIGEST_SEPARATOR) if parts else 0)
+            if parts and length + extra > MAX_MESSAGE_LENGTH - 64:
+                break
+            parts.append(texts.popleft())
+            length += extra
+        if not texts:
+            self._pending.pop(chat_id, None)
+        if len(parts) == 1:
+            return parts[0]
+        return f"📬 {len(parts)} yeni bildirim\n\n" + DIGEST_SEPARATOR.join(parts)
+
+    def _chat_bucket(self, chat_id):
+        bucket = self._chat_buckets.get(chat_id)
+        if bucket is None:
+            # Uzun süredir boşta olan sohbetlerin kovaları temizlenir
+            if len(self._chat_buckets) > 10000:
+                for idle in [c for c, b in self._chat_buckets.items() if b.is_full()]:
+                    del self._chat_buckets[idle]
+            bucket = self._chat_buckets[chat_id] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    async def _worker(self):
+        while True:
+            chat_id = await self._ready.get()
+            self._in_flight.add(chat_id)
+            try:
+                # Sohbet sınırı beklenirken gelen yeni mesajlar aynı özete eklenir
+                await asyncio.sleep(self._chat_bucket(chat_id).reserve())
+                text = self._take_digest(chat_id)
+                if text:
+                    await self._deliver(chat_id, text)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Mesaj gönderme hatası: {str(e)}")
+            finally:
+                self._in_flight.discard(chat_id)
+                if self._pending.get(chat_id):
+                    self._ready.put_nowait(chat_id)
+
+    async def _deliver(self, chat_id, text):
+        """Mesajı genel sınır ve 429 yanıtlarına uyarak gönder"""
+        for attempt in range(self.max_retries):
+            pause = self._paused_until - time.monotonic()
+            if pause > 0:
+                await asyncio.sleep(pause)
+            await asyncio.sleep(self.global_bucket.reserve())
+            try:
+                with SEND_SECONDS.time():
+                    await self.send_message(chat_id=chat_id, text=text)
+                self.sent_count += 1
+                MESSAGES_SENT.inc()
+                return
+            except RetryAfter as e:
+                retry_after = e.retry_after
+                if hasattr(retry_after, "total_seconds"):
+                    retry_after = retry_after.total_seconds()
+                # 429 tüm gönderimleri etkiler, diğer göndericiler de bekler
+                self._paused_until = max(self._paused_until, time.monotonic() + retry_after)
+                logger.warning(
+                    f"Telegram hız sınırı, {retry_after} saniye sonra tekrar denenecek "
+                    f"(deneme {attempt + 1}/{self.max_retries}) - Sohbet: {chat_id}"
+                )
+        logger.error(f"Mesaj {self.max_retries} denemeden sonra gönderilemedi - Sohbet: {chat_id}")
@@ -0,0 +1,83 @@
+import random
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class PollScheduler:
+    """Rastgele sapmalı, hatada geri çekilen ve randevu çıkınca hızlanan kontrol zamanlayıcısı"""
+
+    def __init__(self, min_interval=10, jitter=0.1, backoff_base=30, max_backoff=900,
+                 boost_interval=30, boost_duration=600):
+        self.min_interval = min_interval  # Genel istek bütçesi: iki istek arası en kısa süre (saniye)
+        self.jitter = jitter
+        self.backoff_base = backoff_base
+        self.max_backoff = max_backoff
+        self.boost_interval = boost_interval
+        self.boost_duration = boost_duration
+        self.errors = 0
+        self._backoff_until = 0.0
+        self._last_fetch = None
+        self._boosted = {}  # görevli ülke -> hızlı kontrolün biteceği zaman
+
+    def _jittered(self, seconds):
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def interval_for(self, subscription, now):
+        """Aboneliğin geçerli kontrol aralığı (saniye)"""
+        interval = subscription.frequency * 60
+        for country in subscription.countries:
+            boosted_until = self._boosted.get(country)
+            if boosted_until is not None:
+                if now < boosted_until:
+                    interval = min(interval, self.boost_interval)
+                else:
+                    del self._boosted[country]
+        return max(self.min_interval, interval)
+
+    def schedule(self, subscription, now):
+        """Aboneliğin bir sonraki kontrol zamanını ayarla"""
+        subscription.next_check = now + self._jittered(self.interval_for(subscription, now))
+
+    def boost(self, country, now):
+        """Randevu çıkan ülkeyi bir süre daha sık kontrol et"""
+        if country not in self._boosted:
+            logger.info(f"{country} için kontroller {self.boost_duration} saniye boyunca sıklaştırıldı")
+        self._boosted[country] = now + self.boost_duration
+
+    def record_fetch(self, now):
+        """API isteği yapıldığını kaydet"""
+        self._last_fetch = now
+
+    def record_success(self):
+        """Başarılı istekten sonra geri çekilmeyi sıfırla"""
+        self.errors = 0
+        self._backoff_until = 0.0
+
+    def record_error(self, now):
+        """Hatalı istekten sonra üstel olarak geri çekil, bekleme süresini döndür"""
+        self.errors += 1
+        delay = self._jittered(min(self.max_backoff, self.backoff_base * 2 ** (self.errors - 1)))
+        self._backoff_until = now + delay
+        return delay
+
+    def can_fetch(self, now):
+        """Geri çekilme ve istek bütçesi yeni isteğe izin veriyor mu"""
+        return now >= self._earliest_fetch()
+
+    def _earliest_fetch(self):
+        earliest = self._backoff_until
+        if self._last_fetch is not None:
+            earliest = max(earliest, self._last_fetch + self.min_interval)
+        return earliest
+
+    def wait_for(self, interval, now):
+        """Verilen aralık için sapmalı bekleme, geri çekilme ve bütçe dahil"""
+        return max(self._jittered(interval), self._earliest_fetch() - now)
+
+    def next_wait(self, registry, now):
+        """Bir sonraki kontrole kadar beklenecek süre, takip yoksa None"""
+        wait = registry.next_due_in(now)
+        if wait is None:
+            return None
+        return max(wait, self._earliest_fetch() - now, 0.0)
@@ -1,15 +1,37 @@
 #!/usr/bin/env python3
+import io
 import os
 import sys
 import logging
-import json
+import time
+import secrets
 import asyncio
-import aiohttp
 from datetime import datetime
-from pytz import timezone
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 from telegram.ext import Application, CommandHandler, ContextTypes, CallbackQueryHandler
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, BotCommand
+from appointments import Appointment, format_appointment_message, format_gone_message
+from feed_client import FeedClient
+from snapshot_cache import SnapshotCache
+from sessions import SelectionStore
+from update_processor import ChatOrderedProcessor
+from decode_pool import DecodePool
+from history import HistoryStore
+from tracing import Tracer, add_span, span
+from sources import FeedSource, SourceSet
+from breaker import CLOSED
+from notifier import Notifier
+from scheduler import PollScheduler
+from storage import Storage
+from webhook import WebhookServer
+from cluster import ClusterNode, FileLeaderLock, UnixSocketTransport
+from metrics import (
+    ACTIVE_SUBSCRIPTIONS, CALLBACK_SECONDS, FILTER_SECONDS, HTTP_ERRORS, MATCHES, QUEUE_DEPTH, start_metrics_server
+)
+from subscriptions import WatchRegistry, format_frequency
+from countries import API_URL, CITIES, COUNTRIES
+from filters import WatchFilter, parse_check_args
 
 # Çevre değişkenlerini yükle
 load_dotenv()
@@ -26,46 +48,153 @@ logger = logging.getLogger(__name__)
 TELEGRAM_BOT_TOKEN = "TOKEN"
 TELEGRAM_CHAT_ID = "user-chat-id"
 
-# API URL
-API_URL = "https://api.schengenvisaappointments.com/api/visa-list/?format=json"
-
-# Ülke ve şehir bilgileri
-COUNTRIES = {
-    'France': 'Fransa',
-    'Netherlands': 'Hollanda',
-    'Ireland': 'İrlanda',
-    'Malta': 'Malta',
-    'Sweden': 'İsveç',
-    'Czechia': 'Çekya',
-    'Croatia': 'Hırvatistan',
-    'Bulgaria': 'Bulgaristan',
-    'Finland': 'Finlandiya',
-    'Slovenia': 'Slovenya',
-    'Denmark': 'Danimarka',
-    'Norway': 'Norveç',
-    'Estonia': 'Estonya',
-    'Lithuania': 'Litvanya',
-    'Luxembourg': 'Lüksemburg',
-    'Ukraine': 'Ukrayna',
-    'Latvia': 'Letonya'
-}
-
-CITIES = ['Ankara', 'Istanbul', 'Izmir', 'Antalya', 'Gaziantep', 'Bursa', 'Edirne']
+# HTTP istemci ayarları (saniye)
+HTTP_CONNECT_TIMEOUT = float(os.getenv("HTTP_CONNECT_TIMEOUT", "5"))
+HTTP_READ_TIMEOUT = float(os.getenv("HTTP_READ_TIMEOUT", "20"))
+HTTP_TOTAL_TIMEOUT = float(os.getenv("HTTP_TOTAL_TIMEOUT", "30"))
+
+# Son randevu listesinin sıkıştırılmış kopyası (boşsa diske yazılmaz) ve bellekte geçerlilik süresi (saniye)
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "schengen_bot.snapshot")
+SNAPSHOT_TTL = float(os.getenv("SNAPSHOT_TTL", "300"))
+
+# Randevu geçmişi (boşsa kapalı) ve ham kayıtların özetlenip arşivlenmeden önce saklandığı süre (gün)
+HISTORY_PATH = os.getenv("HISTORY_PATH", "schengen_bot_history.db")
+HISTORY_RETENTION_DAYS = float(os.getenv("HISTORY_RETENTION_DAYS", "30"))
+
+# Ek randevu kaynakları (JSON listesi), ör.
+# [{"name": "yedek", "url": "https://...", "timeout": 10, "fields": {"center_name": "center"}}]
+FEED_SOURCES = os.getenv("FEED_SOURCES", "")
+
+# Yanıtı son isteklerin p95 süresini aşan kaynağa ikinci istek gönderilsin mi
+FEED_HEDGE = os.getenv("FEED_HEDGE", "1") == "1"
+# Devre kesici: art arda bu kadar hatada kaynak devre dışı kalır, süre dolunca tek istekle denenir
+BREAKER_THRESHOLD = int(os.getenv("BREAKER_THRESHOLD", "5"))
+BREAKER_RESET = float(os.getenv("BREAKER_RESET", "60"))
+
+# API yanıtı parça parça çözümlensin mi (düşük bellek kullanımı)
+FEED_STREAMING = os.getenv("FEED_STREAMING", "1") == "1"
+
+# Büyük yanıtların çözümleme ve eşleştirmesi: "auto", "process", "thread" veya "off"
+DECODE_MODE = os.getenv("DECODE_MODE", "auto").lower()
+DECODE_WORKERS = int(os.getenv("DECODE_WORKERS", "2"))
+DECODE_THRESHOLD = int(os.getenv("DECODE_THRESHOLD", str(2 * 1024 * 1024)))  # bayt
+
+# Takiplerin ve bildirilen randevuların saklandığı SQLite dosyası
+DB_PATH = os.getenv("DB_PATH", "schengen_bot.db")
+
+# Güncelleme alma yöntemi: "polling" (varsayılan) veya "webhook"
+UPDATE_MODE = os.getenv("UPDATE_MODE", "polling").lower()
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")  # Telegram'ın erişeceği tam adres, ör. https://ornek.com/telegram
+WEBHOOK_SECRET = os.getenv("WEBHOOK_SECRET", "")
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+
+# Küme modu: bir lider API'yi çeker, düğümler takipleri parçalara bölerek işler
+CLUSTER_MODE = os.getenv("CLUSTER_MODE", "0") == "1"
+SHARD_INDEX = int(os.getenv("SHARD_INDEX", "0"))
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "1"))
+CLUSTER_SOCKET = os.getenv("CLUSTER_SOCKET", "/tmp/schengen_bot.sock")
+CLUSTER_LOCK = os.getenv("CLUSTER_LOCK", "/tmp/schengen_bot.leader.lock")
+
+# Prometheus metrik uç noktası (0 ise kapalı)
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Genel istek bütçesi: iki API isteği arasındaki en kısa süre (saniye)
+POLL_MIN_INTERVAL = float(os.getenv("POLL_MIN_INTERVAL", "10"))
+
+# Telegram gönderim sınırları (mesaj/saniye)
+TELEGRAM_GLOBAL_RATE = float(os.getenv("TELEGRAM_GLOBAL_RATE", "25"))
+TELEGRAM_CHAT_RATE = float(os.getenv("TELEGRAM_CHAT_RATE", "1"))
+
+# Listeden kalkan randevular için de bildirim gönderilsin mi
+NOTIFY_GONE = os.getenv("NOTIFY_GONE", "0") == "1"
+
+# Aynı anda işlenebilecek en fazla Telegram güncellemesi (aynı sohbetinkiler yine sırayla işlenir)
+UPDATE_CONCURRENCY = int(os.getenv("UPDATE_CONCURRENCY", "32"))
+# Sohbet başına sırada bekleyebilecek en fazla güncelleme, fazlası atılır
+UPDATE_CHAT_BACKLOG = int(os.getenv("UPDATE_CHAT_BACKLOG", "10"))
+
+# Yarım kalan seçim akışlarının saklanma süresi (saniye) ve en fazla sayısı
+SELECTION_TTL = float(os.getenv("SELECTION_TTL", "1800"))
+SELECTION_MAX = int(os.getenv("SELECTION_MAX", "10000"))
+
+# Seçim adımlarında gösterilen hazır mesajlar
+CITY_PROMPTS = {eng: f"✅ {tr} seçildi.\n🏢 Lütfen şehir seçin:" for eng, tr in COUNTRIES.items()}
+WINDOW_PROMPTS = {city: f"✅ {city} seçildi.\n📅 Hangi tarihlerdeki randevular bildirilsin?" for city in CITIES}
+CALLBACK_KINDS = ("freq", "country", "city", "window")
+
+
+def country_label(countries):
+    """Ülke listesinin Türkçe adları"""
+    return ", ".join(COUNTRIES.get(country, country) for country in countries)
+
 
 class VisaBot:
     def __init__(self):
         self.app = None
         self.running = False
-        self.current_check = None
-        self.country = None
-        self.city = None
+        self.current_check = None  # Tüm abonelikler için tek kontrol döngüsü
         self.frequency = 5  # Varsayılan kontrol sıklığı (dakika)
-        self.user_selections = {}
+        self.registry = WatchRegistry()
+        self.registry_changed = asyncio.Event()
+        # Büyük yanıtlar olay döngüsünü bekletmemek için havuzda çözümlenir ve eşleştirilir
+        self.decode_pool = DecodePool(
+            CITIES, self.registry.watch_keys, mode=DECODE_MODE, workers=DECODE_WORKERS, threshold=DECODE_THRESHOLD
+        )
+        self.feed = FeedClient(
+            API_URL,
+            connect_timeout=HTTP_CONNECT_TIMEOUT,
+            read_timeout=HTTP_READ_TIMEOUT,
+            total_timeout=HTTP_TOTAL_TIMEOUT,
+            streaming=FEED_STREAMING,
+            record_type=Appointment.from_feed,
+            offload=self.decode_pool
+        )
+        # Ana API ve FEED_SOURCES ile tanımlanan ek kaynaklar eşzamanlı çekilir
+        source_options = dict(hedge=FEED_HEDGE, failure_threshold=BREAKER_THRESHOLD, reset_timeout=BREAKER_RESET)
+        self.sources = SourceSet.from_json(
+            FeedSource("api", self.feed, timeout=HTTP_TOTAL_TIMEOUT, **source_options),
+            FEED_SOURCES,
+            connect_timeout=HTTP_CONNECT_TIMEOUT,
+            read_timeout=HTTP_READ_TIMEOUT,
+            **source_options
+        )
+        # Genel geri çekilme devre kesici açılana kadar köprü görevi görür; daha uzun beklemeyi
+        # kaynakların devre kesicileri yönetir
+        self.scheduler = PollScheduler(min_interval=POLL_MIN_INTERVAL, max_backoff=BREAKER_RESET)
+        # Son çözümlenen randevu listesinin dizini, yeniden başlatmada diskten yüklenir
+        self.cache = SnapshotCache(CITIES, SNAPSHOT_PATH or None, ttl=SNAPSHOT_TTL)
+        self.history = HistoryStore(HISTORY_PATH, retention_days=HISTORY_RETENTION_DAYS) if HISTORY_PATH else None
+        self.storage = Storage(DB_PATH)
+        self.notifier = None  # Giden mesaj kuyruğu, run() içinde oluşturulur
+        self.metrics_server = None
+        self.webhook = None
+        self.cluster = None
+        self.cluster_message_at = None  # Liderden son yayının alındığı zaman
+        self.tracer = Tracer()
+        self.background_tasks = set()  # Sonucu beklenmeyen görevlerin referansları
+        self.update_processor = ChatOrderedProcessor(UPDATE_CONCURRENCY, max_backlog=UPDATE_CHAT_BACKLOG)
+        ACTIVE_SUBSCRIPTIONS.set_function(lambda: len(self.registry))
+        QUEUE_DEPTH.set_function(lambda: self.notifier.depth if self.notifier else 0)
+        # Seçim akışları takiplerden ayrı, süre ve sayı sınırlı tutulur
+        self.selections = SelectionStore(max_size=SELECTION_MAX, ttl=SELECTION_TTL)
+        # Sabit klavyeler bir kez oluşturulup tekrar kullanılır
+        self.country_keyboard = self.create_country_keyboard()
+        self.city_keyboard = self.create_city_keyboard()
+        self.window_keyboard = self.create_window_keyboard()
+        self.frequency_keyboard = self.create_frequency_keyboard()
+
+    @property
+    def snapshot(self):
+        return self.cache.snapshot
 
     def create_frequency_keyboard(self):
         """Kontrol sıklığı için butonlu klavye oluştur"""
         keyboard = [
-            [InlineKeyboardButton(f"{i} Dakika", callback_data=f"freq_{i}") for i in range(1, 6)]
+            [InlineKeyboardButton(f"{i} Dakika", callback_data=f"freq_{i}") for i in range(1, 6)],
+            # Dakikadan kısa aralıklar genel istek bütçesiyle (POLL_MIN_INTERVAL) sınırlanır
+            [InlineKeyboardButton(f"{i} Saniye", callback_data=f"freq_{i / 60:g}") for i in (15, 30)]
         ]
         return InlineKeyboardMarkup(keyboard)
 
@@ -95,33 +224,50 @@ class VisaBot:
             keyboard.append(row)
         return InlineKeyboardMarkup(keyboard)
 
+    def create_window_keyboard(self):
+        """Tarih aralığı seçimi için butonlu klavye oluştur"""
+        keyboard = [
+            [InlineKeyboardButton(f"{days} Gün İçinde", callback_data=f"window_{days}") for days in (30, 60, 90)],
+            [
+                InlineKeyboardButton("Tüm Tarihler", callback_data="window_0"),
+                InlineKeyboardButton("Yalnızca Hafta İçi", callback_data="window_weekdays")
+            ]
+        ]
+        return InlineKeyboardMarkup(keyboard)
+
     async def button_callback(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Buton callback işleyicisi"""
-        try:
-            query = update.callback_query
-            await query.answer()
-            
-            user_id = str(update.effective_user.id)
-            if user_id not in self.user_selections:
-                self.user_selections[user_id] = {}
+        """Buton callback işleyicisi (süresi izlenir)"""
+        with self.tracer.trace("callback"):
+            await self.handle_button(update, context)
 
+    async def handle_button(self, update, context):
+        """Butona göre seçim adımını işle"""
+        started = time.perf_counter()
+        query = update.callback_query
+        kind = query.data.split("_", 1)[0] if query.data else "unknown"
+        # Yanıt, asıl düzenlemeyle aynı anda gönderilir; ara "işleniyor" mesajı yok
+        answer = asyncio.create_task(query.answer())
+        try:
+            user_id = update.effective_user.id
             data = query.data
             logger.info(f"Buton callback alındı: {data} - Kullanıcı: {user_id}")
 
-            # İşlem başladığını kullanıcıya bildir
-            await query.edit_message_text(f"⏳ İşleniyor... Lütfen bekleyin.")
-
             if data.startswith("freq_"):
                 try:
-                    self.frequency = int(data.split("_")[1])
-                    logger.info(f"Kontrol sıklığı ayarlandı: {self.frequency} dakika")
+                    frequency = float(data.split("_")[1])
+                    chat_id = update.effective_chat.id
+                    subscription = self.registry.set_frequency(chat_id, frequency)
+                    logger.info(f"Kontrol sıklığı ayarlandı: {format_frequency(frequency)} - Sohbet: {chat_id}")
                     
-                    if self.running:
-                        await self.stop_checking()
-                        self.running = True
-                        self.current_check = asyncio.create_task(self.check_appointments())
+                    if subscription is None:
+                        await query.edit_message_text("❌ Aktif kontrol bulunmuyor. Lütfen önce /check ile seçim yapın.")
+                        return
+                    self.storage.save_subscription(subscription)
+
+                    # Kontrol döngüsünü yeni zamanlamayla uyandır
+                    self.registry_changed.set()
                     
-                    await query.edit_message_text(f"✅ Kontrol sıklığı {self.frequency} dakika olarak ayarlandı.")
+                    await query.edit_message_text(f"✅ Kontrol sıklığı {format_frequency(frequency)} olarak ayarlandı.")
                 except Exception as e:
                     logger.error(f"Sıklık ayarlama hatası: {str(e)}")
                     await query.edit_message_text(f"❌ Sıklık ayarlanırken hata oluştu: {str(e)}")
@@ -145,20 +291,16 @@ class VisaBot:
                     selected_country_tr = COUNTRIES[selected_country_eng]  # Türkçe karşılığını al
                     logger.info(f"Seçilen ülke: {selected_country_tr} ({selected_country_eng})")
                     
-                    # Kullanıcı seçimlerini güncelle
-                    self.user_selections[user_id] = {"country": selected_country_eng}  # Önceki seçimleri temizle
-                    self.country = selected_country_eng  # Ana değişkeni güncelle
+                    # Yeni akış başlat, önceki seçimler silinir
+                    self.selections.start(user_id, selected_country_eng)
                     
                     # Şehir seçimi için klavyeyi göster
-                    await query.edit_message_text(
-                        f"✅ {selected_country_tr} seçildi.\n🏢 Lütfen şehir seçin:",
-                        reply_markup=self.create_city_keyboard()
-                    )
+                    await query.edit_message_text(CITY_PROMPTS[selected_country_eng], reply_markup=self.city_keyboard)
                 except Exception as e:
                     logger.error(f"Ülke seçimi hatası: {str(e)}")
                     await query.edit_message_text(
                         f"❌ Ülke seçimi sırasında bir hata oluştu: {str(e)}\nLütfen tekrar deneyin.",
-                        reply_markup=self.create_country_keyboard()
+                        reply_markup=self.country_keyboard
                     )
             
             elif data.startswith("city_"):
@@ -172,21 +314,16 @@ class VisaBot:
                         raise ValueError(f"Geçersiz şehir verisi: {data}")
                         
                     selected_city = parts[1]  # Şehir adını al
+                    if selected_city not in WINDOW_PROMPTS:
+                        raise ValueError(f"Geçersiz şehir seçimi: {selected_city}")
                     logger.info(f"Seçilen şehir: {selected_city}")
                     
-                    # Kullanıcı seçimlerini güncelle
-                    self.user_selections[user_id]["city"] = selected_city
-                    
                     # Ülke seçimi yapılmış mı kontrol et
-                    if "country" in self.user_selections[user_id]:
-                        selected_country = self.user_selections[user_id]["country"]
-                        logger.info(f"Randevu kontrolü başlatılıyor: {selected_country} - {selected_city}")
-                        
-                        await self.start_check_with_selections(
-                            update,
-                            selected_country,
-                            selected_city
-                        )
+                    selection = self.selections.get(user_id)
+                    if selection is not None:
+                        selection.city = selected_city
+                        # Tarih aralığı için klavyeyi göster
+                        await query.edit_message_text(WINDOW_PROMPTS[selected_city], reply_markup=self.window_keyboard)
                     else:
                         logger.error(f"Ülke seçimi bulunamadı - Kullanıcı: {user_id}")
                         await query.edit_message_text("❌ Lütfen önce bir ülke seçin.")
@@ -194,7 +331,33 @@ class VisaBot:
                     logger.error(f"Şehir seçimi hatası: {str(e)}")
                     await query.edit_message_text(
                         f"❌ Şehir seçimi sırasında bir hata oluştu: {str(e)}\nLütfen tekrar deneyin.",
-                        reply_markup=self.create_city_keyboard()
+                        reply_markup=self.city_keyboard
+                    )
+            elif data.startswith("window_"):
+                try:
+                    selection = self.selections.get(user_id)
+                    if selection is None or selection.city is None:
+                        await query.edit_message_text("❌ Lütfen önce /check ile ülke ve şehir seçin.")
+                        return
+
+                    choice = data.split("_", 1)[1]
+                    if choice == "weekdays":
+                        filters = WatchFilter(weekdays=0b0011111)
+                    elif int(choice) > 0:
+                        # Aralık kayıtta gün sayısı olarak tutulur, her kontrolde bugünden hesaplanır
+                        filters = WatchFilter(days_ahead=int(choice))
+                    else:
+                        filters = None
+                    logger.info(f"Randevu kontrolü başlatılıyor: {selection.country} - {selection.city}")
+
+                    await self.start_check_with_selections(update, selection.country, selection.city, filters)
+                    # Akış tamamlandı, seçim takibe dönüştü
+                    self.selections.pop(user_id)
+                except Exception as e:
+                    logger.error(f"Tarih aralığı seçimi hatası: {str(e)}")
+                    await query.edit_message_text(
+                        f"❌ Tarih aralığı seçimi sırasında bir hata oluştu: {str(e)}\nLütfen tekrar deneyin.",
+                        reply_markup=self.window_keyboard
                     )
             else:
                 logger.warning(f"Bilinmeyen callback verisi: {data}")
@@ -206,34 +369,45 @@ class VisaBot:
                 await update.callback_query.edit_message_text(f"❌ İşlem sırasında bir hata oluştu: {str(e)}")
             except Exception:
                 logger.error("Hata mesajı gönderilemedi")
+        finally:
+            add_span(f"handle:{kind}", time.perf_counter() - started)
+            try:
+                with span("answer"):
+                    await answer
+            except Exception as e:
+                logger.warning(f"Callback yanıtlanamadı: {str(e)}")
+            CALLBACK_SECONDS.labels(kind if kind in CALLBACK_KINDS else "unknown").observe(time.perf_counter() - started)
 
 
-    async def start_check_with_selections(self, update, country, city):
-        """Seçimlerle randevu kontrolünü başlat"""
+    async def start_check_with_selections(self, update, country, city, filters=None):
+        """Seçimlerle randevu kontrolünü başlat, ülke ve şehir birden çok olabilir"""
         try:
             # Ülke ve şehir bilgilerini kontrol et
             if not country or not city:
                 error_msg = "Ülke veya şehir bilgisi eksik"
                 logger.error(f"Randevu kontrolü başlatılamadı: {error_msg}")
                 
-                if hasattr(update, "callback_query"):
+                if update.callback_query:
                     await update.callback_query.edit_message_text(f"❌ {error_msg}. Lütfen tekrar deneyin.")
                 else:
                     await update.message.reply_text(f"❌ {error_msg}. Lütfen tekrar deneyin.")
                 return
                 
-            # Eğer zaten çalışan bir kontrol varsa durdur
-            if self.running:
-                logger.info(f"Önceki kontrol durduruluyor: {self.country} - {self.city}")
-                await self.stop_checking()
-
-            # Yeni kontrol için değişkenleri ayarla
-            self.country = country
-            self.city = city
-            self.running = True
+            # Sohbetin önceki takibi varsa yenisiyle değiştir
+            chat_id = update.effective_chat.id
+            previous = self.registry.get(chat_id)
+            if previous:
+                logger.info(
+                    f"Önceki kontrol değiştiriliyor: {','.join(previous.countries)} - "
+                    f"{','.join(previous.cities)} - Sohbet: {chat_id}"
+                )
+            frequency = previous.frequency if previous else self.frequency
+            subscription = self.registry.add(chat_id, country, city, frequency, filters)
+            self.storage.save_subscription(subscription)
             
             # Ülke adını Türkçe'ye çevir
-            country_tr = COUNTRIES.get(country, country)
+            country_tr = country_label(subscription.countries)
+            city = ", ".join(subscription.cities)
             
             logger.info(f"Randevu kontrolü başlatılıyor: {country_tr} - {city}")
 
@@ -244,52 +418,55 @@ class VisaBot:
             )
             
             # Mesajı gönder
-            if hasattr(update, "callback_query"):
+            if update.callback_query:
                 await update.callback_query.edit_message_text(
                     message,
-                    reply_markup=self.create_frequency_keyboard()
+                    reply_markup=self.frequency_keyboard
                 )
             else:
                 await update.message.reply_text(
                     message,
-                    reply_markup=self.create_frequency_keyboard()
+                    reply_markup=self.frequency_keyboard
                 )
 
-            # Kontrol görevini başlat
-            self.current_check = asyncio.create_task(self.check_appointments())
-            logger.info(f"Randevu kontrol görevi başlatıldı: {country_tr} - {city}")
+            # Ortak kontrol döngüsünü başlat veya uyandır
+            self.ensure_checking()
+            logger.info(f"Randevu takibi eklendi: {country_tr} - {city} ({len(self.registry)} aktif takip)")
             
             # Telegram chat'e bilgi mesajı gönder
-            try:
-                start_message = (
-                    f"🔄 Randevu kontrolü başlatıldı\n"
-                    f"📍 Ülke: {country_tr}\n"
-                    f"🏢 Şehir: {city}\n"
-                    f"⏱ Kontrol sıklığı: {self.frequency} dakika\n"
-                    f"⏰ Başlangıç: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
-                )
-                await self.app.bot.send_message(
-                    chat_id=TELEGRAM_CHAT_ID,
-                    text=start_message
-                )
-            except Exception as e:
-                logger.error(f"Başlangıç mesajı gönderme hatası: {str(e)}")
+            start_message = (
+                f"🔄 Randevu kontrolü başlatıldı\n"
+                f"📍 Ülke: {country_tr}\n"
+                f"🏢 Şehir: {city}\n"
+                f"⏱ Kontrol sıklığı: {format_frequency(subscription.frequency)}\n"
+                f"⏰ Başlangıç: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
+            )
+            if filters:
+                start_message += "\n".join(filters.describe()) + "\n"
+            self.notifier.send(chat_id, start_message)
+
+            # Güncel liste önbellekteyse ilk eşleşmeler API isteği beklenmeden bildirilir
+            snapshot = self.cache.get()
+            if snapshot is not None and (not self.cluster or self.cluster.owns(chat_id)):
+                self.notify_subscriber(subscription, snapshot)
+                self.scheduler.schedule(subscription, time.monotonic())
                 
         except Exception as e:
             logger.error(f"Randevu kontrolü başlatma hatası: {str(e)}")
             error_message = f"❌ Randevu kontrolü başlatılırken bir hata oluştu: {str(e)}"
             
             try:
-                if hasattr(update, "callback_query"):
+                if update.callback_query:
                     await update.callback_query.edit_message_text(error_message)
                 else:
                     await update.message.reply_text(error_message)
             except Exception:
                 logger.error("Hata mesajı gönderilemedi")
                 
-            # Hata durumunda çalışma durumunu sıfırla
-            self.running = False
-            self.current_check = None
+            # Hata durumunda sohbetin takibini kaldır
+            if update.effective_chat:
+                self.registry.remove(update.effective_chat.id)
+                self.storage.delete_subscription(update.effective_chat.id)
 
     async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Bot başlatma komutu"""
@@ -300,6 +477,7 @@ class VisaBot:
             "/check - Randevu kontrolünü başlat\n"
             "/stop - Aktif kontrolü durdur\n"
             "/status - Mevcut durum bilgisi\n"
+            "/stats - Randevu açılma istatistikleri\n"
             "/help - Yardım menüsü"
         )
         await update.message.reply_text(welcome_message)
@@ -309,11 +487,16 @@ class VisaBot:
         help_text = (
             "📋 Komut Listesi:\n\n"
             "1. Randevu Kontrolü Başlatma:\n"
-            "/check Fransa Istanbul\n\n"
+            "/check Fransa Istanbul\n"
+            "/check Fransa,Hollanda Istanbul,Ankara kategori=Tourism "
+            "tarih=2025-06-01..2025-07-15 gün=pzt,cum\n"
+            "(kategori, tarih ve gün isteğe bağlıdır; gün için haftaici/haftasonu da kullanılabilir)\n\n"
             "2. Kontrol Durdurma:\n"
             "/stop\n\n"
             "3. Durum Kontrolü:\n"
             "/status\n\n"
+            "4. Randevu İstatistikleri:\n"
+            "/stats Fransa Istanbul\n\n"
             "Desteklenen Ülkeler:\n"
             + ", ".join(COUNTRIES.values()) + "\n\n"
             "Desteklenen Şehirler:\n"
@@ -323,202 +506,397 @@ class VisaBot:
 
     async def check(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Randevu kontrolünü başlat"""
+        if context.args:
+            try:
+                countries, cities, filters = parse_check_args(context.args, COUNTRIES, CITIES)
+            except ValueError as e:
+                await update.message.reply_text(f"❌ {str(e)}\nKullanım için /help yazın.")
+                return
+            await self.start_check_with_selections(update, countries, cities, filters)
+            return
         await update.message.reply_text(
             "🌍 Lütfen ülke seçin:",
-            reply_markup=self.create_country_keyboard()
+            reply_markup=self.country_keyboard
         )
 
     async def stop(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Randevu kontrolünü durdur"""
-        if not self.running:
+        subscription = self.registry.remove(update.effective_chat.id)
+        if subscription is None:
             await update.message.reply_text("ℹ️ Aktif kontrol bulunmuyor.")
             return
+        self.storage.delete_subscription(subscription.chat_id)
 
-        await self.stop_checking()
+        # Takip eden kimse kalmadıysa ortak döngüyü de durdur
+        if not self.registry:
+            await self.stop_checking()
         await update.message.reply_text("✅ Randevu kontrolü durduruldu.")
 
     async def status(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Mevcut durum bilgisi"""
-        if not self.running:
+        subscription = self.registry.get(update.effective_chat.id)
+        if subscription is None:
             await update.message.reply_text("ℹ️ Aktif kontrol bulunmuyor.")
             return
 
         status_message = (
-            f"📍 Kontrol Edilen Ülke: {self.country}\n"
-            f"🏢 Kontrol Edilen Şehir: {self.city}\n"
-            f"⏱ Kontrol Sıklığı: {self.frequency} dakika\n"
+            f"📍 Kontrol Edilen Ülke: {country_label(subscription.countries)}\n"
+            f"🏢 Kontrol Edilen Şehir: {', '.join(subscription.cities)}\n"
+            f"⏱ Kontrol Sıklığı: {format_frequency(subscription.frequency)}\n"
+        )
+        if subscription.filters:
+            status_message += "\n".join(subscription.filters.describe()) + "\n"
+        age = self.cache.age()
+        if age is not None:
+            source = " (diskten)" if self.cache.from_disk else ""
+            status_message += f"🗂 Son Liste: {age:.0f} saniye önce{source}\n"
+        status_message += (
+            f"👥 Toplam Aktif Takip: {len(self.registry)}\n"
+            f"🧩 Yarım Kalan Seçim: {len(self.selections)}/{self.selections.max_size} "
+            f"(~{self.selections.size_bytes() / 1024:.0f} KB)\n"
+            f"⚙️ İşlenen Sohbet: {self.update_processor.busy_chats}/{UPDATE_CONCURRENCY}\n"
             "✅ Durum: Aktif"
         )
         await update.message.reply_text(status_message)
 
+    async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Ülke ve şehir için randevu açılma istatistikleri"""
+        if not self.history:
+            await update.message.reply_text("ℹ️ Randevu geçmişi kapalı.")
+            return
+        try:
+            countries, cities, _ = parse_check_args(context.args[:2], COUNTRIES, CITIES)
+        except ValueError as e:
+            await update.message.reply_text(f"❌ {str(e)}\nKullanım: /stats Fransa Istanbul")
+            return
+        country, city = countries[0], cities[0]
+        stats = await self.history.stats(country, city)
+        await update.message.reply_text(stats.format(f"{COUNTRIES[country]} - {city} randevu istatistikleri"))
+
+    def is_admin(self, update):
+        return str(update.effective_chat.id) == str(TELEGRAM_CHAT_ID)
+
+    async def trace(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """En yavaş kontrol turları ve callback'ler (yönetici)"""
+        if not self.is_admin(update):
+            return
+        await update.message.reply_text(
+            "🐢 En yavaş kontrol turları (ms):\n"
+            + self.tracer.format_slowest("check")
+            + "\n\n🐢 En yavaş buton işlemleri (ms):\n"
+            + self.tracer.format_slowest("callback")
+        )
+
+    async def profile(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Sonraki turların cProfile çıktısını dosya olarak gönder (yönetici)"""
+        if not self.is_admin(update):
+            return
+        try:
+            cycles = int(context.args[0]) if context.args else 3
+        except ValueError:
+            await update.message.reply_text("❌ Kullanım: /profile [tur sayısı]")
+            return
+        cycles = max(1, min(cycles, 50))
+        if not self.tracer.start_profile(cycles):
+            await update.message.reply_text(
+                f"ℹ️ Profil ölçümü sürüyor, {self.tracer.profile_cycles} tur kaldı. Rapor bitince gönderilecek."
+            )
+            return
+        await update.message.reply_text(f"🔬 Sonraki {cycles} kontrol turunun profili çıkarılacak.")
+
+    async def send_profile(self, report):
+        """Profil raporunu yöneticiye dosya olarak gönder"""
+        try:
+            await self.app.bot.send_document(
+                chat_id=TELEGRAM_CHAT_ID,
+                document=io.BytesIO(report.encode()),
+                filename=f"profile-{datetime.now().strftime('%Y%m%d-%H%M%S')}.txt",
+                caption="🔬 Kontrol turu profili"
+            )
+        except Exception as e:
+            logger.error(f"Profil gönderilemedi: {str(e)}")
+
+    def restore_subscriptions(self):
+        """Veritabanındaki takipleri ve bildirilen randevuları yükle"""
+        self.storage.open()
+        seen = self.storage.load_seen()
+        for chat_id, countries, cities, frequency, filters in self.storage.load_subscriptions():
+            subscription = self.registry.add(chat_id, countries, cities, frequency, WatchFilter.from_json(filters))
+            for fingerprint, seen_at in seen.get(chat_id, ()):
+                subscription.diff.seen.touch(fingerprint, seen_at)
+        if self.registry:
+            logger.info(f"{len(self.registry)} takip geri yüklendi")
+            self.ensure_checking()
+
+    def ensure_checking(self):
+        """Ortak kontrol döngüsünü başlat, çalışıyorsa uyandır"""
+        if self.cluster:
+            # Küme modunda API kontrolünü lider düğüm yapar
+            return
+        if self.running and self.current_check and not self.current_check.done():
+            self.registry_changed.set()
+            return
+        self.running = True
+        self.current_check = asyncio.create_task(self.check_appointments())
+
     async def stop_checking(self):
         """Kontrol görevini durdur"""
+        task = self.current_check
         self.running = False
-        if self.current_check:
-            self.current_check.cancel()
+        if task:
+            task.cancel()
             try:
-                await self.current_check
+                await task
             except asyncio.CancelledError:
                 pass
-        self.current_check = None
+        # Beklerken başka bir sohbet döngüyü yeniden başlatmış olabilir
+        if self.current_check is task:
+            self.current_check = None
+
+    def notify_admin(self, text):
+        """Bot yöneticisine uyarı mesajı gönder"""
+        self.notifier.send(TELEGRAM_CHAT_ID, text)
+
+    def notify_subscriber(self, subscription, snapshot, count=True):
+        """Dizinde aboneliğe uyan randevuları bul ve bildir, snapshot None ise akış değişmemiştir"""
+        if count:
+            subscription.check_count += 1
+        new_appointments = []
+        gone_appointments = []
+        if snapshot is not None:
+            # Yalnızca yeni çıkan (ve isteğe bağlı olarak kapanan) randevular bildirilir
+            matches = subscription.match(snapshot)
+            new_appointments, gone_appointments = subscription.diff.update(matches)
+            # Listedeki randevular yeniden başlatmada tekrar bildirilmesin diye saklanır
+            self.storage.mark_seen(subscription.chat_id, subscription.diff.active)
+
+        if gone_appointments and NOTIFY_GONE:
+            for appt in gone_appointments:
+                self.notifier.send(subscription.chat_id, format_gone_message(appt.mission, appt))
+
+        # Bulunan randevuları bildir
+        if new_appointments:
+            MATCHES.inc(len(new_appointments))
+            logger.info(
+                f"{len(new_appointments)} yeni randevu bulundu: "
+                f"{','.join(subscription.countries)} - {','.join(subscription.cities)} - Sohbet: {subscription.chat_id}"
+            )
+            # Randevu çıkan ülke bir süre daha sık kontrol edilir
+            now = time.monotonic()
+            for country in {appt.mission for appt in new_appointments}:
+                self.scheduler.boost(country, now)
+
+            # Aynı sohbete giden randevular kuyrukta tek özet mesajda birleştirilir
+            for appt in new_appointments:
+                self.notifier.send(subscription.chat_id, format_appointment_message(appt.mission, appt))
+        else:
+            if snapshot is not None:
+                logger.info(
+                    f"Yeni randevu bulunamadı: {','.join(subscription.countries)} - {','.join(subscription.cities)}"
+                )
+
+            # Her 10 kontrolde bir durum bildirimi gönder
+            if subscription.check_count % 10 == 0:
+                status_message = (
+                    f"ℹ️ Durum Güncellemesi\n"
+                    f"📍 Ülke: {country_label(subscription.countries)}\n"
+                    f"🏢 Şehir: {', '.join(subscription.cities)}\n"
+                    f"🔄 Kontrol Sayısı: {subscription.check_count}\n"
+                    f"⏱ Kontrol Sıklığı: {format_frequency(subscription.frequency)}\n"
+                    f"⏰ Son Kontrol: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
+                    f"✅ Durum: Aktif olarak kontrol ediliyor"
+                )
+                self.notifier.send(subscription.chat_id, status_message)
+
+    def dispatch(self, subscriptions, count=True):
+        """Son anlık görüntüyü aboneliklere dağıt"""
+        generation = self.cache.generation
+        for subscription in subscriptions:
+            # Yalnızca henüz görmediği listeyle filtrelenir; seyrek kontrol edilen abonelik,
+            # kendi turu gelmeden değişen listeyi bir sonraki turunda yine eşleştirir
+            if self.snapshot is not None and subscription.matched_generation != generation:
+                subscription.matched_generation = generation
+                self.notify_subscriber(subscription, self.snapshot, count)
+            else:
+                self.notify_subscriber(subscription, None, count)
+
+    def apply_cluster_message(self, message, owns):
+        """Liderin yayınladığı anlık görüntüyü bu düğümün takiplerine uygula"""
+        changed = message["type"] == "snapshot"
+        if changed:
+            filter_start = time.perf_counter()
+            self.cache.update([Appointment.from_tuple(values) for values in message["records"]])
+            # Geçmişi yalnızca lider yazar
+            if self.history and self.cluster and self.cluster.is_leader:
+                self.history.record(self.snapshot)
+        elif self.snapshot is None:
+            return
+        else:
+            self.cache.touch()
+        # Her takip kendi sıklığıyla kontrol edilir; kontrol zamanı iki yayın arasına düşen takip
+        # yayınlardan hangisine yakınsa onda kontrol edilir
+        now = time.monotonic()
+        slack = (now - self.cluster_message_at) / 2 if self.cluster_message_at is not None else 0.0
+        self.cluster_message_at = now
+        due = [s for s in self.registry if owns(s.chat_id) and s.is_due(now + slack)]
+        self.dispatch(due)
+        for subscription in due:
+            self.scheduler.schedule(subscription, now)
+        if changed:
+            FILTER_SECONDS.observe(time.perf_counter() - filter_start)
 
     async def check_appointments(self):
-        """Randevu kontrolü yap"""
-        check_count = 0
-        last_error_time = None
-        error_count = 0
-        first_check = True
+        """Tüm abonelikler için randevu kontrolü yap"""
+        tick_count = 0
         
         while self.running:
-            check_count += 1
             try:
-                logger.info(f"Randevu kontrolü yapılıyor: {self.country} - {self.city} (Kontrol #{check_count})")
-                
-                # Sadece ilk kontrolde bildirim gönder, diğer kontrollerde gönderme
-                if first_check:
-                    first_check = False
-                    # İlk kontrol bildirimini atla çünkü start_check_with_selections'da zaten gönderiliyor
-                    logger.info("İlk kontrol - bildirim atlanıyor çünkü başlangıç bildirimi zaten gönderildi")
-                    # Bildirim gönderme kodu kaldırıldı
-                
-                # API'ye istek gönder
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        async with session.get(API_URL, timeout=30) as response:
-                            if response.status != 200:
-                                error_msg = f"API hatası: HTTP {response.status}"
-                                logger.error(error_msg)
-                                
-                                # Sürekli hata durumunda kullanıcıya bildir
-                                error_count += 1
-                                if error_count >= 3:
-                                    await self.app.bot.send_message(
-                                        chat_id=TELEGRAM_CHAT_ID,
-                                        text=f"⚠️ API bağlantı sorunu: {error_msg}\nKontroller devam ediyor."
-                                    )
-                                    error_count = 0
-                                continue
+                self.registry_changed.clear()
+                now = time.monotonic()
+                due = self.registry.due(now) if self.scheduler.can_fetch(now) else []
+
+                if due:
+                    # Tur aşamaları izlenir, profil istenmişse tur profile eklenir
+                    with self.tracer.trace("check", profile=True):
+                        tick_count += 1
+                        logger.info(f"Randevu kontrolü yapılıyor: {len(due)} takip (Tur #{tick_count})")
 
-                            # Başarılı yanıt, hata sayacını sıfırla
-                            error_count = 0
-                            
-                            try:
-                                data = await response.json()
-                                logger.info(f"API'den {len(data)} randevu bilgisi alındı")
-                            except json.JSONDecodeError as e:
-                                logger.error(f"API yanıtı JSON formatında değil: {str(e)}")
+                        # Her turda her kaynağa tek istek gönderilir, sonuç tüm abonelere dağıtılır
+                        error = None
+                        failures = []
+                        skipped = 0
+                        dispatched = False
+                        self.scheduler.record_fetch(now)
+                        async for source, changed, source_error, source_skipped in self.sources.poll():
+                            if source_skipped:
+                                # Devresi açık kaynağa istek yapılmadı; son başarılı kayıtları kullanılır
+                                skipped += 1
                                 continue
-                            
-                            available_appointments = []
-
-                            # Randevuları filtrele
-                            for appointment in data:
-                                try:
-                                    source = appointment.get('source_country')
-                                    mission = appointment.get('mission_country', '')
-                                    center = appointment.get('center_name', '')
-                                    
-                                    # Ülke ve şehir kontrolü
-                                    if (
-                                        source == 'Turkiye'
-                                        and self.country == mission
-                                        and center and self.city and self.city.lower() in center.lower()
-                                    ):
-                                        # Randevu tarihini Türkiye saat dilimine çevir
-                                        appointment_date = appointment.get('appointment_date')
-                                        if appointment_date:
-                                            try:
-                                                date_obj = datetime.fromisoformat(appointment_date.replace('Z', '+00:00'))
-                                                tr_timezone = timezone('Europe/Istanbul')
-                                                tr_date = date_obj.astimezone(tr_timezone)
-                                                formatted_date = tr_date.strftime('%d.%m.%Y %H:%M')
-                                            except ValueError as e:
-                                                logger.warning(f"Tarih çevirme hatası: {str(e)}")
-                                                formatted_date = appointment_date
-                                        else:
-                                            formatted_date = 'Tarih bilgisi yok'
-                                        
-                                        # Randevu bilgilerini ekle
-                                        available_appointments.append({
-                                            'date': formatted_date,
-                                            'center': center,
-                                            'category': appointment.get('visa_category', 'Belirtilmemiş'),
-                                            'link': appointment.get('book_now_link', '#')
-                                        })
-                                except Exception as e:
-                                    logger.warning(f"Randevu işleme hatası: {str(e)}")
-                                    continue
-
-                            # Bulunan randevuları bildir
-                            if available_appointments:
-                                logger.info(f"{len(available_appointments)} uygun randevu bulundu")
-                                for appt in available_appointments:
-                                    message = (
-                                        f"🎉 {self.country} için randevu bulundu!\n\n"
-                                        f"📍 Merkez: {appt['center']}\n"
-                                        f"📅 Tarih: {appt['date']}\n"
-                                        f"📋 Kategori: {appt['category']}\n"
-                                        f"🔗 Randevu Linki:\n{appt['link']}"
-                                    )
-                                    try:
-                                        await self.app.bot.send_message(
-                                            chat_id=TELEGRAM_CHAT_ID,
-                                            text=message
-                                        )
-                                    except Exception as e:
-                                        logger.error(f"Mesaj gönderme hatası: {str(e)}")
-                            else:
-                                logger.info(f"Uygun randevu bulunamadı: {self.country} - {self.city}")
-                                
-                                # Her 10 kontrolde bir durum bildirimi gönder
-                                if check_count % 10 == 0:
-                                    status_message = (
-                                        f"ℹ️ Durum Güncellemesi\n"
-                                        f"📍 Ülke: {self.country}\n"
-                                        f"🏢 Şehir: {self.city}\n"
-                                        f"🔄 Kontrol Sayısı: {check_count}\n"
-                                        f"⏱ Kontrol Sıklığı: {self.frequency} dakika\n"
-                                        f"⏰ Son Kontrol: {datetime.now().strftime('%d.%m.%Y %H:%M')}\n"
-                                        f"✅ Durum: Aktif olarak kontrol ediliyor"
-                                    )
-                                    try:
-                                        await self.app.bot.send_message(
-                                            chat_id=TELEGRAM_CHAT_ID,
-                                            text=status_message
-                                        )
-                                    except Exception as e:
-                                        logger.error(f"Durum mesajı gönderme hatası: {str(e)}")
-                    except aiohttp.ClientError as e:
-                        logger.error(f"API bağlantı hatası: {str(e)}")
-                        error_count += 1
-                        
+                            if source_error is not None:
+                                failures.append(f"{source.name}: {source_error}")
+                                # Devresi açık kaynak istek yapmadığı için tekrar bildirilmez
+                                if len(self.sources) > 1 and source.errors % 3 == 0 and source.breaker.state == CLOSED:
+                                    self.notify_admin(f"⚠️ {source.name} kaynağı yanıt vermiyor: {source_error}")
+                                continue
+                            if not changed:
+                                logger.info(f"{source.name} yanıtı değişmedi, filtreleme atlanıyor")
+                                self.cache.touch()
+                                continue
+                            filter_start = time.perf_counter()
+                            with span("index"):
+                                self.cache.update(self.sources.merged())
+                            if self.history:
+                                self.history.record(self.snapshot)
+                            logger.info(f"{source.name} kaynağından {len(source.records)} randevu bilgisi alındı")
+                            # Sonuçlar diğer kaynakları beklemeden bildirilir, aynı turda gelen
+                            # sonraki kaynaklar yalnızca yeni randevuları ekler
+                            with span("match"):
+                                self.dispatch(due, count=not dispatched)
+                            dispatched = True
+                            FILTER_SECONDS.observe(time.perf_counter() - filter_start)
+
+                        if failures and len(failures) + skipped == len(self.sources):
+                            error = f"API bağlantı hatası: {'; '.join(failures)}"
+                            logger.error(error)
+
+                        if error:
+                            HTTP_ERRORS.inc()
+                            # Hatalı turda abonelikler ertelenmez, geri çekilme bitince tekrar denenir
+                            delay = self.scheduler.record_error(time.monotonic())
+                            logger.info(f"Art arda {self.scheduler.errors}. hata, {delay:.0f} saniye geri çekiliniyor")
+                            # Sürekli hata durumunda yöneticiye bildir
+                            if self.scheduler.errors % 3 == 0:
+                                self.notify_admin(f"⚠️ {error}\nKontroller devam ediyor.")
+                            # Kaynaklara ulaşılamazken yeni takipler son başarılı listeyle yanıtlanır
+                            if self.snapshot is not None:
+                                self.dispatch([s for s in due if s.check_count == 0])
+                        else:
+                            # Hiçbir kaynağa istek yapılmadıysa geri çekilme durumu değişmez
+                            if skipped < len(self.sources):
+                                self.scheduler.record_success()
+                            if not dispatched:
+                                with span("match"):
+                                    self.dispatch(due)
+                            now = time.monotonic()
+                            for subscription in due:
+                                self.scheduler.schedule(subscription, now)
+
+                    report = self.tracer.take_profile()
+                    if report:
+                        task = asyncio.create_task(self.send_profile(report))
+                        self.background_tasks.add(task)
+                        task.add_done_callback(self.background_tasks.discard)
+
             except asyncio.CancelledError:
                 logger.info("Randevu kontrolü iptal edildi")
                 break
             except Exception as e:
                 logger.error(f"Kontrol sırasında beklenmeyen hata: {str(e)}")
-                error_count += 1
+                self.scheduler.record_error(time.monotonic())
                 
-                # Sürekli hata durumunda kullanıcıya bildir
-                if error_count >= 3:
-                    try:
-                        await self.app.bot.send_message(
-                            chat_id=TELEGRAM_CHAT_ID,
-                            text=f"⚠️ Randevu kontrolü sırasında hata: {str(e)}\nKontroller devam ediyor."
-                        )
-                    except Exception:
-                        pass
-                    error_count = 0
-
-            # Bir sonraki kontrole kadar bekle
-            logger.info(f"Bir sonraki kontrol için {self.frequency} dakika bekleniyor...")
-            await asyncio.sleep(self.frequency * 60)
+                # Sürekli hata durumunda yöneticiye bildir
+                if self.scheduler.errors % 3 == 0:
+                    self.notify_admin(f"⚠️ Randevu kontrolü sırasında hata: {str(e)}\nKontroller devam ediyor.")
+
+            # Bir sonraki kontrole kadar bekle, abonelik değişirse erken uyan
+            wait = self.scheduler.next_wait(self.registry, time.monotonic())
+            if wait is None:
+                logger.info("Aktif takip kalmadı, yeni abonelik bekleniyor...")
+            else:
+                logger.info(f"Bir sonraki kontrol için {wait:.0f} saniye bekleniyor...")
+            try:
+                await asyncio.wait_for(self.registry_changed.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+    async def start_webhook(self):
+        """Webhook sunucusunu başlat ve Telegram'a kaydet"""
+        if not WEBHOOK_URL:
+            raise ValueError("WEBHOOK_URL tanımlı değil")
+        secret_token = WEBHOOK_SECRET
+        if not secret_token:
+            # Birden fazla örnek çalışıyorsa hepsinde aynı anahtar tanımlanmalı
+            secret_token = secrets.token_urlsafe(32)
+            logger.warning("WEBHOOK_SECRET tanımlı değil, rastgele anahtar üretildi")
+
+        server = WebhookServer(
+            self.app,
+            path=urlparse(WEBHOOK_URL).path or "/",
+            secret_token=secret_token,
+            host=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT
+        )
+        await server.start()
+        try:
+            await self.app.bot.set_webhook(
+                url=WEBHOOK_URL,
+                secret_token=secret_token,
+                allowed_updates=["message", "callback_query"],
+                drop_pending_updates=True
+            )
+        except Exception:
+            await server.stop()
+            raise
+        self.webhook = server
+        logger.info(f"Webhook kaydedildi: {WEBHOOK_URL}")
 
     async def run(self):
         """Bot'u başlat"""
         try:
             logger.info("Bot yapılandırılıyor...")
-            self.app = Application.builder().token(TELEGRAM_BOT_TOKEN).build()
+            # Farklı sohbetlerin güncellemeleri birbirini beklemez
+            self.app = (
+                Application.builder()
+                .token(TELEGRAM_BOT_TOKEN)
+                .concurrent_updates(self.update_processor)
+                .build()
+            )
+            # Küme modunda genel Telegram sınırı düğümler arasında paylaştırılır
+            self.notifier = Notifier(
+                self.app.bot.send_message,
+                global_rate=TELEGRAM_GLOBAL_RATE / (SHARD_COUNT if CLUSTER_MODE else 1),
+                chat_rate=TELEGRAM_CHAT_RATE
+            )
 
             # Komut açıklamalarını tanımla
             commands = [
@@ -526,7 +904,8 @@ class VisaBot:
                 BotCommand("help", "Yardım menüsü"),
                 BotCommand("check", "Randevu kontrolünü başlat"),
                 BotCommand("stop", "Aktif kontrolü durdur"),
-                BotCommand("status", "Mevcut durum bilgisi")
+                BotCommand("status", "Mevcut durum bilgisi"),
+                BotCommand("stats", "Randevu açılma istatistikleri")
             ]
             
             # Komutları ekle
@@ -536,6 +915,9 @@ class VisaBot:
             self.app.add_handler(CommandHandler("check", self.check))
             self.app.add_handler(CommandHandler("stop", self.stop))
             self.app.add_handler(CommandHandler("status", self.status))
+            self.app.add_handler(CommandHandler("stats", self.stats))
+            self.app.add_handler(CommandHandler("trace", self.trace))
+            self.app.add_handler(CommandHandler("profile", self.profile))
             
             # Callback işleyicisini ekle - önemli: callback_query'leri işlemek için
             logger.info("Callback işleyicisi ekleniyor...")
@@ -545,17 +927,58 @@ class VisaBot:
             logger.info("Bot başlatılıyor...")
             await self.app.initialize()
             await self.app.start()
+            self.notifier.start()
+
+            # Prometheus metrik uç noktası
+            if METRICS_PORT:
+                self.metrics_server = await start_metrics_server(METRICS_HOST, METRICS_PORT)
+
+            if CLUSTER_MODE:
+                self.cluster = ClusterNode(
+                    self,
+                    UnixSocketTransport(CLUSTER_SOCKET),
+                    FileLeaderLock(CLUSTER_LOCK),
+                    shard_index=SHARD_INDEX,
+                    shard_count=SHARD_COUNT
+                )
+
+            # Kayıtlı takipleri geri yükle
+            self.cache.load()
+            self.restore_subscriptions()
+            self.storage.start()
+            self.cache.start()
+            if self.history:
+                self.history.open()
+                self.history.start()
+            if self.cache.from_disk and self.registry:
+                # Ağ isteği bitmeden diskteki listeyle ilk eşleşmeler bildirilir; küme modunda
+                # her düğüm yalnızca kendi parçasındaki takipleri bildirir
+                owned = [s for s in self.registry if not self.cluster or self.cluster.owns(s.chat_id)]
+                self.dispatch(owned, count=False)
+            if self.cluster:
+                self.cluster.start()
             
             # Komut listesini Telegram'a kaydet
             logger.info("Komut listesi Telegram'a kaydediliyor...")
             await self.app.bot.set_my_commands(commands)
             
-            # Polling başlat - callback_query'leri de dinle
-            logger.info("Polling başlatılıyor...")
-            await self.app.updater.start_polling(
-                allowed_updates=["message", "callback_query"],  # callback_query'leri de dinle
-                drop_pending_updates=True
-            )
+            # Webhook seçildiyse güncellemeleri yerel HTTP sunucusundan al
+            if UPDATE_MODE == "webhook":
+                try:
+                    await self.start_webhook()
+                except Exception as e:
+                    logger.error(f"Webhook başlatılamadı, polling'e geçiliyor: {str(e)}")
+
+            if self.cluster and SHARD_INDEX != 0 and self.webhook is None:
+                # Küme modunda polling yalnızca ilk düğümde yapılır
+                logger.info("Telegram güncellemeleri bu düğümde dinlenmiyor")
+            elif self.webhook is None:
+                # Polling başlat - callback_query'leri de dinle
+                logger.info("Polling başlatılıyor...")
+                await self.app.updater.start_polling(
+                    allowed_updates=["message", "callback_query"],  # callback_query'leri de dinle
+                    drop_pending_updates=True
+                )
             
             # Başlangıç mesajı
             logger.info("Bot başarıyla başlatıldı ve çalışıyor!")
@@ -576,10 +999,35 @@ class VisaBot:
             if self.app:
                 logger.info("Bot kapatılıyor...")
                 try:
+                    # Webhook'u kapat, kuyruktaki güncellemelerin işlenmesini bekle
+                    if self.webhook:
+                        logger.info("Webhook sunucusu kapatılıyor...")
+                        await self.webhook.stop()
+
+                    # Küme görevlerini durdur, liderlik başka düğüme geçer
+                    if self.cluster:
+                        await self.cluster.stop()
+
                     # Aktif kontrolleri durdur
                     if self.running:
                         logger.info("Aktif kontroller durduruluyor...")
                         await self.stop_checking()
+
+                    # Kuyrukta bekleyen mesajları gönder
+                    await self.notifier.stop()
+
+                    # Paylaşılan HTTP bağlantılarını kapat
+                    await self.sources.close()
+                    self.decode_pool.close()
+
+                    # Bekleyen veritabanı yazmalarını tamamla
+                    await self.storage.close()
+                    await self.cache.close()
+                    if self.history:
+                        await self.history.close()
+
+                    if self.metrics_server:
+                        await self.metrics_server.cleanup()
                     
                     # Bot'u kapat
                     if self.app.updater and self.app.updater.running:
@@ -0,0 +1,70 @@
+import sys
+import time
+from collections import OrderedDict
+
+
+class Selection:
+    """Yarım kalan /check seçim akışı"""
+
+    __slots__ = ('country', 'city', 'touched_at')
+
+    def __init__(self, country=None, city=None, touched_at=0.0):
+        self.country = country
+        self.city = city
+        self.touched_at = touched_at
+
+
+class SelectionStore:
+    """Kullanıcı başına seçim akışları; süresi dolan ve sınırı aşan en eski kayıtlar atılır
+
+    Tamamlanan akış takip kaydına (WatchRegistry) dönüşür ve buradan silinir.
+    """
+
+    def __init__(self, max_size=10000, ttl=1800):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries = OrderedDict()  # kullanıcı -> Selection, en eski dokunulan başta
+        self.evicted = 0
+
+    def get(self, user_id, now=None):
+        """Süresi dolmamış seçimi döndür ve tazele, yoksa None"""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        selection = self._entries.get(user_id)
+        if selection is not None:
+            selection.touched_at = now
+            self._entries.move_to_end(user_id)
+        return selection
+
+    def start(self, user_id, country, now=None):
+        """Yeni akış başlat, kullanıcının önceki seçimini değiştir"""
+        now = time.monotonic() if now is None else now
+        self.expire(now)
+        selection = Selection(country, None, now)
+        self._entries[user_id] = selection
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+        return selection
+
+    def pop(self, user_id):
+        """Tamamlanan veya iptal edilen akışı sil"""
+        return self._entries.pop(user_id, None)
+
+    def expire(self, now=None):
+        """Süresi dolan akışları sil"""
+        now = time.monotonic() if now is None else now
+        while self._entries:
+            selection = next(iter(self._entries.values()))
+            if now - selection.touched_at < self.ttl:
+                break
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def size_bytes(self):
+        """Kayıtların yaklaşık bellek kullanımı (adlar paylaşıldığı için sayılmaz)"""
+        return sys.getsizeof(self._entries) + sum(sys.getsizeof(selection) for selection in self._entries.values())
+
+    def __len__(self):
+        return len(self._entries)
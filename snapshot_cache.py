@@ -0,0 +1,139 @@
+import os
+import mmap
+import json
+import zlib
+import time
+import struct
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from appointments import Appointment, SnapshotIndex
+from decode_pool import DecodedFeed
+
+logger = logging.getLogger(__name__)
+
+# Dosya başlığı: sürüm işareti ve anlık görüntünün alındığı zaman (epoch saniye)
+MAGIC = b"VSC1"
+HEADER = struct.Struct("!4sd")
+
+
+class SnapshotCache:
+    """Son randevu listesinin dizini: bellekte süre sınırlı, diskte sıkıştırılmış kopya"""
+
+    def __init__(self, cities, path=None, ttl=300, max_disk_age=3600, save_interval=30):
+        self.cities = cities
+        self.path = path
+        self.ttl = ttl
+        self.max_disk_age = max_disk_age
+        self.save_interval = save_interval
+        self.snapshot = None
+        self.updated_at = None  # Listenin kaynakla en son doğrulandığı zaman
+        self.from_disk = False
+        # Her yeni listede artar; abonelikler en son hangi listeyle eşleştirildiğini bununla tutar
+        self.generation = 0
+        self._dirty = False
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="snapshot")
+        self._save_task = None
+
+    def update(self, records):
+        """Yeni listeyi dizine çevir ve sakla, havuzda kurulmuş dizin varsa onu kullan"""
+        if isinstance(records, DecodedFeed):
+            self.snapshot = records.snapshot
+        else:
+            self.snapshot = SnapshotIndex(records, self.cities)
+        self.generation += 1
+        self.updated_at = time.time()
+        self.from_disk = False
+        self._dirty = True
+        return self.snapshot
+
+    def touch(self):
+        """Kaynak değişmediğini bildirdi, mevcut liste hâlâ güncel"""
+        if self.snapshot is not None and not self.from_disk:
+            self.updated_at = time.time()
+
+    def age(self, now=None):
+        """Listenin yaşı (saniye), liste yoksa None"""
+        if self.updated_at is None:
+            return None
+        return (time.time() if now is None else now) - self.updated_at
+
+    def get(self, now=None):
+        """Süresi dolmamış dizini döndür, yoksa None"""
+        age = self.age(now)
+        if age is None or age > self.ttl:
+            return None
+        return self.snapshot
+
+    def load(self):
+        """Diskteki son anlık görüntüyü yükle, yüklendiyse True döndür"""
+        if not self.path or not os.path.exists(self.path):
+            return False
+        try:
+            with open(self.path, "rb") as handle, mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                magic, saved_at = HEADER.unpack_from(mapped)
+                if magic != MAGIC:
+                    logger.warning(f"Anlık görüntü dosyası tanınmadı: {self.path}")
+                    return False
+                age = time.time() - saved_at
+                if age > self.max_disk_age:
+                    logger.info(f"Diskteki anlık görüntü çok eski ({age:.0f} sn), kullanılmıyor")
+                    return False
+                # Sıkıştırılmış gövde kopyalanmadan doğrudan eşlenen bellekten açılır
+                with memoryview(mapped) as view:
+                    rows = json.loads(zlib.decompress(view[HEADER.size:]))
+        except (OSError, ValueError, zlib.error, struct.error) as e:
+            logger.warning(f"Anlık görüntü okunamadı: {str(e)}")
+            return False
+        self.snapshot = SnapshotIndex((Appointment.from_tuple(row) for row in rows), self.cities)
+        self.generation += 1
+        self.updated_at = saved_at
+        self.from_disk = True
+        logger.info(f"Diskten {len(self.snapshot)} randevu yüklendi ({age:.0f} sn önceki liste)")
+        return True
+
+    def _write(self, records, saved_at):
+        payload = zlib.compress(json.dumps([record.astuple() for record in records], separators=(",", ":")).encode(), 6)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "wb") as handle:
+            handle.write(HEADER.pack(MAGIC, saved_at))
+            handle.write(payload)
+        # Okuyucular hiçbir zaman yarım yazılmış dosya görmez
+        os.replace(temp_path, self.path)
+
+    async def save(self):
+        """Değiştiyse son listeyi olay döngüsü dışında diske yaz"""
+        if not self.path or not self._dirty or self.snapshot is None:
+            return
+        self._dirty = False
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._write, self.snapshot.records, self.updated_at
+        )
+
+    def start(self):
+        """Periyodik disk kaydını başlat"""
+        if self.path and self._save_task is None:
+            self._save_task = asyncio.create_task(self._save_loop())
+
+    async def _save_loop(self):
+        while True:
+            await asyncio.sleep(self.save_interval)
+            try:
+                await self.save()
+            except OSError as e:
+                logger.error(f"Anlık görüntü yazılamadı: {str(e)}")
+
+    async def close(self):
+        """Bekleyen kaydı tamamla"""
+        if self._save_task is not None:
+            self._save_task.cancel()
+            try:
+                await self._save_task
+            except asyncio.CancelledError:
+                pass
+            self._save_task = None
+        try:
+            await self.save()
+        except OSError as e:
+            logger.error(f"Anlık görüntü yazılamadı: {str(e)}")
+        self._executor.shutdown(wait=True)
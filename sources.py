@@ -0,0 +1,235 @@
+import json
+import time
+import asyncio
+import logging
+from collections import deque
+from appointments import Appointment
+from breaker import CircuitBreaker, CircuitOpen
+from feed_client import FeedClient
+from metrics import CIRCUIT_OPENS, HEDGED_REQUESTS, SOURCE_ERRORS
+from tracing import span
+
+logger = logging.getLogger(__name__)
+
+# Ortak şemadaki alanların ana API'deki adları
+FEED_FIELDS = {
+    'source_country': 'source_country',
+    'mission_country': 'mission_country',
+    'center_name': 'center_name',
+    'visa_category': 'visa_category',
+    'appointment_date': 'appointment_date',
+    'book_now_link': 'book_now_link'
+}
+
+
+def mapped_record_type(fields, defaults=None):
+    """Farklı alan adları kullanan sağlayıcı kayıtlarını ortak şemaya (Appointment) çeviren fonksiyon"""
+    mapping = {**FEED_FIELDS, **fields}
+    defaults = defaults or {}
+
+    def convert(entry):
+        return Appointment.from_feed({
+            feed_key: entry.get(provider_key, defaults.get(feed_key))
+            for feed_key, provider_key in mapping.items()
+        })
+
+    return convert
+
+
+class LatencyWindow:
+    """Son başarılı isteklerin süreleri"""
+
+    def __init__(self, size=50):
+        self._samples = deque(maxlen=size)
+
+    def add(self, seconds):
+        self._samples.append(seconds)
+
+    def percentile(self, fraction):
+        """Yeterli örnek yoksa None"""
+        if len(self._samples) < 10:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class FeedSource:
+    """Tek randevu kaynağı: kendi HTTP istemcisi, zaman aşımı, devre kesicisi ve son başarılı kayıtları"""
+
+    def __init__(self, name, client, timeout=30, hedge=True, min_hedge_delay=0.5,
+                 failure_threshold=5, reset_timeout=60):
+        self.name = name
+        self.client = client
+        self.timeout = timeout
+        # p95 süresini aşan isteğe ikinci bir istek eşlik eder, önce gelen yanıt kullanılır
+        self.hedge = hedge
+        self.min_hedge_delay = min_hedge_delay
+        self.latency = LatencyWindow()
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+        self.records = []  # Son başarılı yanıtın kayıtları
+        self.last_success = None
+        self.errors = 0
+
+    @classmethod
+    def from_config(cls, config, connect_timeout=5, read_timeout=20, **options):
+        """{"name", "url", "timeout", "fields", "defaults"} yapılandırmasından oluştur"""
+        timeout = float(config.get("timeout", 30))
+        fields = config.get("fields")
+        client = FeedClient(
+            config["url"],
+            connect_timeout=min(connect_timeout, timeout),
+            read_timeout=min(read_timeout, timeout),
+            total_timeout=timeout,
+            # Farklı şemalı kaynaklarda akışlı kaynak ülke süzmesi kullanılamaz
+            streaming=not fields,
+            source_country=None if fields else 'Turkiye',
+            record_type=mapped_record_type(fields, config.get("defaults")) if fields else Appointment.from_feed
+        )
+        return cls(config.get("name") or config["url"], client, timeout, **options)
+
+    def hedge_delay(self):
+        """İkinci isteğin gönderileceği süre, yeterli ölçüm yoksa None"""
+        if not self.hedge:
+            return None
+        p95 = self.latency.percentile(0.95)
+        if p95 is None:
+            return None
+        return max(self.min_hedge_delay, p95)
+
+    async def _hedged_fetch(self):
+        # İstekler istemci durumunu değiştirmez, yalnızca kullanılan yanıt saklanır
+        tasks = [asyncio.ensure_future(self.client.request())]
+        try:
+            delay = self.hedge_delay()
+            if delay is not None:
+                done, _ = await asyncio.wait(tasks, timeout=delay)
+                if not done:
+                    HEDGED_REQUESTS.inc()
+                    logger.info(f"{self.name} yanıtı {delay:.1f} saniyeyi aştı, ikinci istek gönderiliyor")
+                    tasks.append(asyncio.ensure_future(self.client.request()))
+            pending = set(tasks)
+            error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        return self.client.commit(task.result())
+                    error = task.exception()
+            raise error
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def fetch(self):
+        """Kaynağı kendi süre sınırıyla çek, değiştiyse True döndür
+
+        Devre açıkken istek yapılmaz ve CircuitOpen yükseltilir; son başarılı kayıtlar kullanılmaya devam eder.
+        """
+        now = time.monotonic()
+        if not self.breaker.allow(now):
+            raise CircuitOpen(self.breaker.retry_in(now))
+        opens = self.breaker.opens
+        started = time.perf_counter()
+        try:
+            data = await asyncio.wait_for(self._hedged_fetch(), timeout=self.timeout)
+        except asyncio.CancelledError:
+            self.breaker.abort_probe()
+            raise
+        except Exception:
+            self.breaker.record_failure(time.monotonic())
+            if self.breaker.opens != opens:
+                CIRCUIT_OPENS.inc()
+            raise
+        self.latency.add(time.perf_counter() - started)
+        self.breaker.record_success()
+        self.last_success = time.monotonic()
+        self.errors = 0
+        if data is None:
+            return False
+        self.records = data
+        return True
+
+    async def close(self):
+        await self.client.close()
+
+
+class SourceSet:
+    """Kaynakları eşzamanlı çeker, sonuçları tek kayıt listesinde birleştirir"""
+
+    def __init__(self, sources):
+        self.sources = list(sources)
+
+    @classmethod
+    def from_json(cls, primary, text, connect_timeout=5, read_timeout=20, **options):
+        """Ana kaynağa JSON listesiyle tanımlanan ek kaynakları ekle"""
+        sources = [primary]
+        for config in json.loads(text) if text else ():
+            sources.append(FeedSource.from_config(config, connect_timeout, read_timeout, **options))
+        return cls(sources)
+
+    async def poll(self):
+        """Kaynakları aynı anda çek, her biri bittikçe (kaynak, değişti mi, hata, atlandı mı) döndür
+
+        Yavaş veya yanıt vermeyen kaynak diğerlerinin sonuçlarını bekletmez. Devresi açık kaynağa
+        istek yapılmaz; atlanan kaynak hata sayılmaz.
+        """
+        async def run(source):
+            try:
+                with span(f"fetch:{source.name}"):
+                    return source, await source.fetch(), None, False
+            except asyncio.TimeoutError:
+                return source, False, f"{source.timeout:g} saniyede yanıt vermedi", False
+            except CircuitOpen as e:
+                # Devre açıkken istek yapılmadı, hata sayılmaz
+                return source, False, str(e), True
+            except Exception as e:
+                return source, False, str(e) or type(e).__name__, False
+
+        for task in asyncio.as_completed([run(source) for source in self.sources]):
+            source, changed, error, skipped = await task
+            if skipped:
+                logger.debug(f"{source.name} atlandı: {error}")
+            elif error is not None:
+                source.errors += 1
+                SOURCE_ERRORS.inc()
+                logger.warning(f"Kaynak hatası ({source.name}): {error}")
+            yield source, changed, error, skipped
+
+    async def fetch(self):
+        """Tüm kaynakları bekle, biri değiştiyse birleşik listeyi döndür, hiçbiri değişmediyse None
+
+        İstek yapılan bütün kaynaklar hata verirse ConnectionError, hiçbirine istek yapılmadıysa
+        (tüm devreler açık) CircuitOpen yükseltilir.
+        """
+        changed = False
+        failures = []
+        skipped = []
+        async for source, source_changed, error, source_skipped in self.poll():
+            if source_skipped:
+                skipped.append(source)
+            elif error is not None:
+                failures.append(f"{source.name}: {error}")
+            changed = changed or source_changed
+        if len(skipped) == len(self.sources):
+            now = time.monotonic()
+            raise CircuitOpen(min(source.breaker.retry_in(now) for source in skipped))
+        if failures and len(failures) + len(skipped) == len(self.sources):
+            raise ConnectionError("; ".join(failures))
+        return self.merged() if changed else None
+
+    def merged(self):
+        """Kaynakların son kayıtları, aynı randevu birden çok kaynakta varsa bir kez"""
+        if len(self.sources) == 1:
+            return self.sources[0].records
+        unique = {}
+        for source in self.sources:
+            for record in source.records:
+                unique.setdefault(record.astuple(), record)
+        return list(unique.values())
+
+    async def close(self):
+        for source in self.sources:
+            await source.close()
+
+    def __len__(self):
+        return len(self.sources)
@@ -0,0 +1,161 @@
+import time
+import sqlite3
+import asyncio
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS subscriptions (
+    chat_id INTEGER PRIMARY KEY,
+    country TEXT NOT NULL,
+    city TEXT NOT NULL,
+    frequency REAL NOT NULL,
+    started_at TEXT NOT NULL,
+    filters TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS seen (
+    chat_id INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    seen_at REAL NOT NULL,
+    PRIMARY KEY (chat_id, fingerprint)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS seen_by_time ON seen (seen_at);
+"""
+
+
+class Storage:
+    """Abonelikleri ve bildirilen randevuları saklayan SQLite katmanı"""
+
+    def __init__(self, path, flush_interval=2.0, seen_ttl=24 * 3600):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.seen_ttl = seen_ttl
+        self._conn = None
+        # Tüm veritabanı işlemleri olay döngüsü dışında tek bir iş parçacığında yapılır
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="storage")
+        self._upserts = {}  # sohbet -> abonelik satırı
+        self._deletes = set()
+        self._seen = {}  # (sohbet, özet) -> görülme zamanı
+        self._flush_task = None
+
+    def open(self):
+        """Veritabanını aç ve tabloları oluştur"""
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        # Eski veritabanlarına takip koşulları sütunu eklenir
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(subscriptions)")]
+        if "filters" not in columns:
+            self._conn.execute("ALTER TABLE subscriptions ADD COLUMN filters TEXT NOT NULL DEFAULT ''")
+        self._conn.commit()
+        logger.info(f"Veritabanı açıldı: {self.path}")
+
+    def load_subscriptions(self):
+        """Kayıtlı abonelikleri (sohbet, ülkeler, şehirler, sıklık, koşullar) olarak döndür"""
+        rows = self._conn.execute(
+            "SELECT chat_id, country, city, frequency, filters FROM subscriptions"
+        )
+        return [
+            (chat_id, tuple(country.split(",")), tuple(city.split(",")), frequency, filters)
+            for chat_id, country, city, frequency, filters in rows
+        ]
+
+    async def reload_subscriptions(self):
+        """Bekleyen yazmaları tamamlayıp abonelikleri olay döngüsü dışında oku"""
+        await self.flush()
+        return await asyncio.get_running_loop().run_in_executor(self._executor, self.load_subscriptions)
+
+    def load_seen(self):
+        """Süresi dolmamış bildirilen randevuları sohbet bazında döndür"""
+        seen = {}
+        rows = self._conn.execute(
+            "SELECT chat_id, fingerprint, seen_at FROM seen WHERE seen_at >= ? ORDER BY seen_at",
+            (time.time() - self.seen_ttl,)
+        )
+        for chat_id, fingerprint, seen_at in rows:
+            seen.setdefault(chat_id, []).append((fingerprint, seen_at))
+        return seen
+
+    def save_subscription(self, subscription):
+        """Aboneliği yazma kuyruğuna ekle"""
+        self._deletes.discard(subscription.chat_id)
+        self._upserts[subscription.chat_id] = (
+            subscription.chat_id,
+            ",".join(subscription.countries),
+            ",".join(subscription.cities),
+            subscription.frequency,
+            subscription.started_at.isoformat(),
+            subscription.filters_json
+        )
+
+    def delete_subscription(self, chat_id):
+        """Aboneliğin silinmesini yazma kuyruğuna ekle"""
+        self._upserts.pop(chat_id, None)
+        self._deletes.add(chat_id)
+
+    def mark_seen(self, chat_id, fingerprints, seen_at=None):
+        """Bildirilen randevu özetlerini yazma kuyruğuna ekle"""
+        seen_at = time.time() if seen_at is None else seen_at
+        for fingerprint in fingerprints:
+            self._seen[(chat_id, fingerprint)] = seen_at
+
+    def start(self):
+        """Toplu yazma görevini başlat"""
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def close(self):
+        """Bekleyen yazmaları tamamla ve veritabanını kapat"""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        if self._conn is not None:
+            await self.flush()
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._conn.close)
+            self._conn = None
+            logger.info("Veritabanı kapatıldı")
+        self._executor.shutdown(wait=True)
+
+    async def flush(self):
+        """Kuyruktaki değişiklikleri tek işlemde yaz"""
+        if not (self._upserts or self._deletes or self._seen):
+            return
+        upserts = list(self._upserts.values())
+        deletes = [(chat_id,) for chat_id in self._deletes]
+        seen = [(chat_id, fingerprint, seen_at) for (chat_id, fingerprint), seen_at in self._seen.items()]
+        self._upserts = {}
+        self._deletes = set()
+        self._seen = {}
+        await asyncio.get_running_loop().run_in_executor(
+            self._executor, self._write, upserts, deletes, seen
+        )
+
+    def _write(self, upserts, deletes, seen):
+        with self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO subscriptions (chat_id, country, city, frequency, started_at, filters) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                upserts
+            )
+            self._conn.executemany("DELETE FROM subscriptions WHERE chat_id = ?", deletes)
+            self._conn.executemany("DELETE FROM seen WHERE chat_id = ?", deletes)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO seen (chat_id, fingerprint, seen_at) VALUES (?, ?, ?)",
+                seen
+            )
+            self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (time.time() - self.seen_ttl,))
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.flush()
+            except sqlite3.Error as e:
+                logger.error(f"Veritabanı yazma hatası: {str(e)}")
@@ -0,0 +1,125 @@
+import time
+from datetime import datetime
+from appointments import AppointmentDiff
+
+
+def format_frequency(frequency):
+    """Kontrol sıklığını okunur metne çevir"""
+    if frequency < 1:
+        return f"{round(frequency * 60)} saniye"
+    return f"{frequency:g} dakika"
+
+
+def _as_tuple(value):
+    return (value,) if isinstance(value, str) else tuple(value)
+
+
+class Subscription:
+    """Bir sohbete ait randevu takibi"""
+
+    __slots__ = (
+        'chat_id', 'countries', 'cities', 'frequency', 'filters', 'predicate', 'pairs', 'watch_key',
+        'check_count', 'next_check', 'diff', 'started_at', 'matched_generation'
+    )
+
+    def __init__(self, chat_id, country, city, frequency=5, filters=None):
+        self.chat_id = chat_id
+        self.countries = _as_tuple(country)  # Bir veya birden çok görevli ülke
+        self.cities = _as_tuple(city)
+        self.frequency = frequency  # Kontrol sıklığı (dakika, dakikadan kısa aralıklar için kesirli)
+        self.filters = filters  # Kategori, tarih aralığı ve gün koşulları (WatchFilter veya None)
+        # Koşullar abonelik başına bir kez derlenir, eşleştirmede yeniden yorumlanmaz
+        self.predicate = filters.compile() if filters else None
+        self.pairs = [(country, city) for country in self.countries for city in self.cities]
+        # Aynı koşullu takipler çözümleme havuzunda bir kez eşleştirilir
+        self.watch_key = (self.countries, self.cities, self.filters_json)
+        self.check_count = 0
+        self.next_check = 0.0  # Yeni abonelik ilk turda hemen kontrol edilir
+        self.diff = AppointmentDiff()  # Daha önce bildirilen randevular
+        self.started_at = datetime.now()
+        self.matched_generation = 0  # En son eşleştirildiği listenin SnapshotCache.generation değeri
+
+    @property
+    def country(self):
+        """İlk görevli ülke"""
+        return self.countries[0]
+
+    @property
+    def city(self):
+        """İlk şehir"""
+        return self.cities[0]
+
+    @property
+    def filters_json(self):
+        return self.filters.to_json() if self.filters else ''
+
+    def match(self, snapshot):
+        """Dizinden aboneliğin tüm koşullarına uyan randevuları döndür"""
+        matches = snapshot.matches.get(self.watch_key)
+        if matches is not None:
+            return matches
+        if len(self.pairs) == 1:
+            matches = snapshot.lookup(*self.pairs[0])
+        else:
+            matches = [appt for country, city in self.pairs for appt in snapshot.lookup(country, city)]
+        if self.predicate is not None:
+            # Koşullar yalnızca dizinden dönen adaylara uygulanır
+            matches = [appt for appt in matches if self.predicate(appt)]
+        return matches
+
+    def is_due(self, now):
+        """Kontrol zamanı geldi mi"""
+        return now >= self.next_check
+
+
+class WatchRegistry:
+    """Sohbet başına abonelik kaydı"""
+
+    def __init__(self):
+        self._subscriptions = {}
+
+    def add(self, chat_id, country, city, frequency=5, filters=None):
+        """Aboneliği ekle, sohbetin önceki takibini değiştir"""
+        subscription = Subscription(chat_id, country, city, frequency, filters)
+        self._subscriptions[chat_id] = subscription
+        return subscription
+
+    def remove(self, chat_id):
+        """Sohbetin aboneliğini kaldır"""
+        return self._subscriptions.pop(chat_id, None)
+
+    def get(self, chat_id):
+        """Sohbetin aboneliğini döndür"""
+        return self._subscriptions.get(chat_id)
+
+    def set_frequency(self, chat_id, frequency):
+        """Sohbetin kontrol sıklığını güncelle"""
+        subscription = self._subscriptions.get(chat_id)
+        if subscription is None:
+            return None
+        subscription.frequency = frequency
+        subscription.next_check = min(subscription.next_check, time.monotonic() + frequency * 60)
+        return subscription
+
+    def due(self, now):
+        """Kontrol zamanı gelmiş abonelikler"""
+        return [s for s in self._subscriptions.values() if s.is_due(now)]
+
+    def watch_keys(self):
+        """Kayıtlı takiplerin farklı (ülkeler, şehirler, koşullar) anahtarları"""
+        return {s.watch_key for s in self._subscriptions.values()}
+
+    def next_due_in(self, now):
+        """En yakın kontrole kalan süre (saniye)"""
+        if not self._subscriptions:
+            return None
+        return max(0.0, min(s.next_check for s in self._subscriptions.values()) - now)
+
+    def __len__(self):
+        return len(self._subscriptions)
+
+    def __iter__(self):
+        return iter(list(self._subscriptions.values()))
+
+    def __contains__(self, chat_id):
+        return chat_id in self._subscriptions
@@ -0,0 +1,106 @@
+import time
+import asyncio
+from appointments import Appointment
+from cluster import ClusterNode, LocalLeaderLock, LocalTransport
+from scheduler import PollScheduler
+from schengen_bot import VisaBot
+from subscriptions import WatchRegistry
+from test_dispatch import FakeNotifier
+
+CHAT_IDS = range(1, 41)
+
+
+class FakeSources:
+    def __init__(self):
+        self.fetches = 0
+
+    async def fetch(self):
+        self.fetches += 1
+        return [Appointment('Turkiye', 'France', 'Istanbul VFS', 'Tourism', '2026-11-01T09:00:00Z', f'link-{self.fetches}')]
+
+
+class FakeBot:
+    """ClusterNode'un kullandığı VisaBot alanları"""
+
+    def __init__(self):
+        self.registry = WatchRegistry()
+        for chat_id in CHAT_IDS:
+            self.registry.add(chat_id, 'France', 'Istanbul', frequency=0.001)
+        self.scheduler = PollScheduler(min_interval=0.02, jitter=0)
+        self.sources = FakeSources()
+        self.messages = []  # (mesaj türü, bu düğümün işlediği sohbetler)
+
+    def apply_cluster_message(self, message, owns):
+        self.messages.append((message["type"], {s.chat_id for s in self.registry if owns(s.chat_id)}))
+
+
+async def wait_until(condition, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "koşul zamanında sağlanmadı"
+        await asyncio.sleep(0.01)
+
+
+async def run_cluster():
+    transport = LocalTransport()
+    bots = [FakeBot(), FakeBot()]
+    nodes = [
+        ClusterNode(bot, transport, LocalLeaderLock("test-cluster"), shard_index=index, shard_count=2,
+                    sync_interval=3600, retry_interval=0.01)
+        for index, bot in enumerate(bots)
+    ]
+    nodes[0].start()
+    await asyncio.sleep(0)
+    nodes[1].start()
+    try:
+        # Lider API'yi çeker, iki düğüm de yayını alır
+        await wait_until(lambda: all(bot.messages for bot in bots))
+        assert nodes[0].is_leader and not nodes[1].is_leader
+        assert bots[0].sources.fetches > 0 and bots[1].sources.fetches == 0
+        assert bots[0].messages[0][0] == "snapshot"
+
+        # Parçalar ayrık ve birlikte tüm takipleri kapsıyor
+        owned = [bot.messages[-1][1] for bot in bots]
+        assert owned[0] and owned[1]
+        assert owned[0].isdisjoint(owned[1])
+        assert owned[0] | owned[1] == set(CHAT_IDS)
+
+        # Lider durunca diğer düğüm liderliği alır ve yayına devam eder
+        await nodes[0].stop()
+        await wait_until(lambda: nodes[1].is_leader)
+        await wait_until(lambda: bots[1].sources.fetches > 0)
+        received = len(bots[1].messages)
+        await wait_until(lambda: len(bots[1].messages) > received)
+        assert bots[1].messages[-1][1] == owned[1]
+    finally:
+        for node in nodes:
+            await node.stop()
+
+
+def test_leader_publishes_to_shards_and_fails_over():
+    asyncio.run(run_cluster())
+
+
+def test_cluster_messages_follow_each_subscription_frequency():
+    bot = VisaBot()
+    bot.notifier = FakeNotifier()
+    bot.scheduler = PollScheduler(min_interval=0, jitter=0)
+    fast = bot.registry.add(1, 'France', 'Istanbul', frequency=0.001)
+    slow = bot.registry.add(2, 'France', 'Istanbul', frequency=60)
+    bot.apply_cluster_message({"type": "snapshot", "records": []}, lambda chat_id: True)
+    for _ in range(3):
+        time.sleep(0.1)
+        bot.apply_cluster_message({"type": "unchanged"}, lambda chat_id: True)
+    assert fast.check_count == 4
+    assert slow.check_count == 1
+
+
+def test_leader_boosts_countries_with_new_slots():
+    bot = FakeBot()
+    node = ClusterNode(bot, LocalTransport(), LocalLeaderLock("test-boost"))
+    now = time.monotonic()
+    node._boost_new(asyncio.run(bot.sources.fetch()), now)
+    # İlk yayında karşılaştırılacak önceki liste yok
+    assert not bot.scheduler._boosted
+    node._boost_new(asyncio.run(bot.sources.fetch()), now)
+    assert bot.scheduler._boosted == {'France': now + bot.scheduler.boost_duration}
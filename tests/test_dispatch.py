@@ -0,0 +1,39 @@
+from appointments import Appointment
+from schengen_bot import VisaBot
+
+
+class FakeNotifier:
+    def __init__(self):
+        self.sent = []  # (sohbet, mesaj)
+
+    def send(self, chat_id, text):
+        self.sent.append((chat_id, text))
+
+
+def slot(link):
+    return Appointment('Turkiye', 'France', 'Istanbul VFS', 'Tourism', '2026-11-01T09:00:00Z', link)
+
+
+def notified(bot, chat_id):
+    return [text for chat, text in bot.notifier.sent if chat == chat_id and 'link-1' in text]
+
+
+def test_infrequent_subscription_sees_change_from_a_tick_it_was_not_due():
+    bot = VisaBot()
+    bot.notifier = FakeNotifier()
+    fast = bot.registry.add(1, 'France', 'Istanbul', frequency=1)
+    slow = bot.registry.add(2, 'France', 'Istanbul', frequency=5)
+
+    # İlk tur: ikisi de boş listeyle eşleşir
+    bot.cache.update([])
+    bot.dispatch([fast, slow])
+
+    # Yalnızca sık kontrol edilen abonelik sıradayken yeni randevu çıkar
+    bot.cache.update([slot('link-1')])
+    bot.dispatch([fast])
+    assert len(notified(bot, 1)) == 1
+
+    # Liste değişmeden ikisi birden sıradadır; seyrek abonelik yine bildirilir
+    bot.dispatch([fast, slow])
+    assert len(notified(bot, 1)) == 1
+    assert len(notified(bot, 2)) == 1
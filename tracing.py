@@ -0,0 +1,147 @@
+import io
+import time
+import heapq
+import pstats
+import cProfile
+import itertools
+from datetime import datetime
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Çalışan turun izi; alt görevler ve HTTP istemcisi aynı ize aşama ekler
+current_trace = ContextVar("current_trace", default=None)
+
+
+class Trace:
+    """Tek tur veya callback için aşama süreleri"""
+
+    __slots__ = ('name', 'started_at', 'wall_time', 'spans', 'total')
+
+    def __init__(self, name):
+        self.name = name
+        self.started_at = time.perf_counter()
+        self.wall_time = time.time()
+        self.spans = []  # (aşama, saniye)
+        self.total = None
+
+    @contextmanager
+    def span(self, stage):
+        """Bloğun süresini aşama olarak kaydet"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.spans.append((stage, time.perf_counter() - start))
+
+    def add(self, stage, seconds):
+        self.spans.append((stage, seconds))
+
+    def finish(self):
+        self.total = time.perf_counter() - self.started_at
+        return self.total
+
+    def format(self):
+        stages = ", ".join(f"{stage} {seconds * 1000:.0f}" for stage, seconds in self.spans)
+        started = datetime.fromtimestamp(self.wall_time).strftime('%d.%m %H:%M:%S')
+        return f"{started} - {self.total * 1000:.0f} ms\n   {stages or 'aşama yok'}"
+
+
+def add_span(stage, seconds):
+    """Çalışan ize aşama ekle, iz yoksa bir şey yapma"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.add(stage, seconds)
+
+
+@contextmanager
+def span(stage):
+    """Çalışan izde bloğun süresini ölç"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    with trace.span(stage):
+        yield
+
+
+class SlowestTraces:
+    """En yavaş N izi tutan halka"""
+
+    def __init__(self, size=10):
+        self.size = size
+        self._heap = []
+        self._counter = itertools.count()
+
+    def record(self, trace):
+        item = (trace.total, next(self._counter), trace)
+        if len(self._heap) < self.size:
+            heapq.heappush(self._heap, item)
+        elif trace.total > self._heap[0][0]:
+            heapq.heapreplace(self._heap, item)
+
+    def slowest(self):
+        return [trace for _, _, trace in sorted(self._heap, reverse=True)]
+
+
+class Tracer:
+    """Turları izler, en yavaşları saklar ve istenirse sonraki turların profilini çıkarır"""
+
+    def __init__(self, keep=10):
+        self.keep = keep
+        self.slowest = {}  # iz adı -> SlowestTraces
+        self.profile_cycles = 0
+        self._profiler = None
+        self._report = None
+
+    def start_profile(self, cycles):
+        """Sonraki turlarda cProfile ile ölçümü başlat, ölçüm sürüyorsa False döndür"""
+        if self.profile_cycles > 0:
+            return False
+        self.profile_cycles = cycles
+        self._profiler = cProfile.Profile()
+        self._report = None
+        return True
+
+    @contextmanager
+    def trace(self, name, profile=False):
+        """İzi başlat; profile=True ise profil ölçümü açıkken tur profile eklenir"""
+        trace = Trace(name)
+        token = current_trace.set(trace)
+        # Açılan profil nesnesi turla birlikte tutulur, kapatılan hep aynısıdır
+        profiler = self._profiler if profile and self.profile_cycles > 0 else None
+        if profiler is not None:
+            profiler.enable()
+        try:
+            yield trace
+        finally:
+            if profiler is not None:
+                profiler.disable()
+                self.profile_cycles -= 1
+                if self.profile_cycles == 0:
+                    self._report = self._render_profile()
+            current_trace.reset(token)
+            trace.finish()
+            slowest = self.slowest.get(name)
+            if slowest is None:
+                slowest = self.slowest[name] = SlowestTraces(self.keep)
+            slowest.record(trace)
+
+    def _render_profile(self):
+        stream = io.StringIO()
+        stats = pstats.Stats(self._profiler, stream=stream)
+        stats.strip_dirs().sort_stats("cumulative").print_stats(60)
+        self._profiler = None
+        return stream.getvalue()
+
+    def take_profile(self):
+        """Tamamlanan profil raporunu bir kez döndür"""
+        report, self._report = self._report, None
+        return report
+
+    def format_slowest(self, name, limit=5):
+        """En yavaş izlerin okunur listesi"""
+        slowest = self.slowest.get(name)
+        traces = slowest.slowest()[:limit] if slowest else []
+        if not traces:
+            return "Henüz iz yok."
+        return "\n".join(f"{i}) {trace.format()}" for i, trace in enumerate(traces, 1))
@@ -0,0 +1,61 @@
+import logging
+from collections import deque
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+
+class ChatOrderedProcessor(BaseUpdateProcessor):
+    """Güncellemeleri sınırlı sayıda eşzamanlı işler, aynı sohbetin güncellemeleri geliş sırasıyla işlenir
+
+    Sohbetin önceki güncellemesi işlenirken gelenler o sohbetin kuyruğuna eklenir ve eşzamanlılık
+    sınırından yer tutmaz; kuyruğu sohbeti işleyen görev boşaltır. Kuyruk max_backlog güncellemeyle
+    sınırlıdır, fazlası işlenmeden atılır.
+    """
+
+    def __init__(self, max_concurrent_updates, max_backlog=10):
+        super().__init__(max_concurrent_updates)
+        self.max_backlog = max_backlog
+        self.dropped = 0
+        self._queues = {}  # sohbet -> bekleyen güncelleme işleri
+
+    async def do_process_update(self, update, coroutine):
+        chat = getattr(update, "effective_chat", None)
+        if chat is None:
+            await coroutine
+            return
+        queue = self._queues.get(chat.id)
+        if queue is not None:
+            # İlk eleman işlenmekte olan güncellemedir
+            if len(queue) > self.max_backlog:
+                coroutine.close()
+                self.dropped += 1
+                logger.warning(f"Sohbet {chat.id} için bekleyen güncelleme sınırı aşıldı, güncelleme atlandı")
+                return
+            queue.append(coroutine)
+            return
+        queue = self._queues[chat.id] = deque([coroutine])
+        try:
+            while queue:
+                try:
+                    await queue[0]
+                except Exception as e:
+                    # Hata işleyicisine ulaşmayan hata sohbetin sonraki güncellemelerini engellemez
+                    logger.error(f"Güncelleme işlenemedi (sohbet {chat.id}): {str(e)}")
+                queue.popleft()
+        finally:
+            del self._queues[chat.id]
+            # İptal durumunda bekleyen işler kapatılır
+            for pending in queue:
+                pending.close()
+
+    @property
+    def busy_chats(self):
+        """Güncellemesi işlenen sohbet sayısı"""
+        return len(self._queues)
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        pass
@@ -0,0 +1,135 @@
+"""Tek seferlik randevu kontrolü: python -m visa_check France Istanbul [kategori=... tarih=... gün=...]
+
+Cron veya sunucusuz işlerde hızlı açılış için yalnızca standart kütüphane ve
+hafif modüller yüklenir; Telegram ve aiohttp yığınına dokunulmaz.
+"""
+import os
+import sys
+import json
+import zlib
+import argparse
+import logging
+import urllib.parse
+import urllib.request
+
+from countries import API_URL, CITIES, COUNTRIES
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+# Çıkış kodları: cron tarafında randevu bulunup bulunmadığı ayırt edilebilsin
+EXIT_FOUND = 0
+EXIT_NONE = 1
+EXIT_ERROR = 2
+
+
+def fetch_records(url, timeout=30, source_country='Turkiye'):
+    """Randevu listesini indir, kaynak ülkeye göre akış halinde çözümle"""
+    from feed_stream import RecordStream
+    from appointments import Appointment
+
+    request = urllib.request.Request(url, headers={"Accept-Encoding": "gzip, deflate"})
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        encoding = response.headers.get("Content-Encoding", "")
+        # gzip ve zlib başlıkları otomatik algılanır
+        decompressor = zlib.decompressobj(47) if encoding in ("gzip", "deflate") else None
+        stream = RecordStream(source_country)
+        records = []
+        while True:
+            chunk = response.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            if decompressor is not None:
+                chunk = decompressor.decompress(chunk)
+            records.extend(Appointment.from_feed(entry) for entry in stream.feed(chunk))
+        if decompressor is not None:
+            records.extend(Appointment.from_feed(entry) for entry in stream.feed(decompressor.flush()))
+        stream.close()
+    return records
+
+
+def send_telegram(token, chat_id, text, timeout=10):
+    """Tek mesajı Telegram Bot API'sine gönder"""
+    base_url = os.getenv("TELEGRAM_API_URL", "https://api.telegram.org")
+    data = urllib.parse.urlencode({"chat_id": chat_id, "text": text}).encode()
+    with urllib.request.urlopen(f"{base_url}/bot{token}/sendMessage", data=data, timeout=timeout) as response:
+        response.read()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(
+        prog="python -m visa_check",
+        description="Bir ülke ve şehir için randevuları bir kez kontrol et"
+    )
+    parser.add_argument("country", help="Görevli ülke(ler), ör. France veya Fransa,Hollanda")
+    parser.add_argument("city", help="Başvuru şehri/şehirleri, ör. Istanbul,Ankara")
+    parser.add_argument("options", nargs="*",
+                        help="Bot ile aynı koşullar: kategori=Tourism tarih=2025-06-01..2025-07-15 gün=pzt,cum")
+    parser.add_argument("--json", action="store_true", help="Sonuçları JSON olarak yazdır")
+    parser.add_argument("--notify", action="store_true",
+                        help="Sonuçları TELEGRAM_BOT_TOKEN/TELEGRAM_CHAT_ID ile Telegram'a gönder")
+    parser.add_argument("--url", default=os.getenv("VISA_API_URL", API_URL), help="Randevu listesi adresi")
+    parser.add_argument("--timeout", type=float, default=30, help="İstek zaman aşımı (saniye)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(levelname)s - %(message)s')
+
+    from filters import parse_check_args
+    try:
+        countries, cities, filters = parse_check_args([args.country, args.city] + args.options, COUNTRIES, CITIES)
+    except ValueError as e:
+        print(f"{str(e)}. Desteklenen ülkeler: {', '.join(COUNTRIES)}; şehirler: {', '.join(CITIES)}",
+              file=sys.stderr)
+        return EXIT_ERROR
+
+    from appointments import SnapshotIndex, format_appointment_message
+    from subscriptions import Subscription
+
+    try:
+        records = fetch_records(args.url, timeout=args.timeout)
+    except (OSError, ValueError) as e:
+        print(f"API hatası: {str(e)}", file=sys.stderr)
+        return EXIT_ERROR
+
+    # Bot ile aynı derlenmiş koşullar ve dizin sorgusu kullanılır
+    appointments = Subscription(None, countries, cities, filters=filters).match(SnapshotIndex(records, cities))
+
+    if args.json:
+        print(json.dumps([
+            {
+                "country": a.mission,
+                "center": a.center,
+                "category": a.category,
+                "date": a.date,
+                "link": a.link
+            }
+            for a in appointments
+        ], ensure_ascii=False, indent=2))
+    elif appointments:
+        print("\n\n".join(format_appointment_message(a.mission, a) for a in appointments))
+    else:
+        places = ", ".join(COUNTRIES[country] for country in countries)
+        print(f"{places} - {', '.join(cities)} için uygun randevu bulunamadı.")
+
+    if args.notify and appointments:
+        token = os.getenv("TELEGRAM_BOT_TOKEN")
+        chat_id = os.getenv("TELEGRAM_CHAT_ID")
+        if not token or not chat_id:
+            print("TELEGRAM_BOT_TOKEN ve TELEGRAM_CHAT_ID tanımlanmalı", file=sys.stderr)
+            return EXIT_ERROR
+        try:
+            for appointment in appointments:
+                send_telegram(token, chat_id, format_appointment_message(appointment.mission, appointment))
+        except OSError as e:
+            print(f"Telegram hatası: {str(e)}", file=sys.stderr)
+            return EXIT_ERROR
+
+    return EXIT_FOUND if appointments else EXIT_NONE
+
+
+if __name__ == "__main__":
+    sys.exit(main())
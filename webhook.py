@@ -0,0 +1,68 @@
+import hmac
+import time
+import asyncio
+import logging
+from aiohttp import web
+from telegram import Update
+
+logger = logging.getLogger(__name__)
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+class WebhookServer:
+    """Telegram güncellemelerini webhook ile alan aiohttp uç noktası"""
+
+    def __init__(self, application, path, secret_token, host="0.0.0.0", port=8443, drain_timeout=10):
+        self.application = application
+        self.path = path
+        self.secret_token = secret_token
+        self.host = host
+        self.port = port
+        self.drain_timeout = drain_timeout
+        self.draining = False
+        self._runner = None
+
+    async def start(self):
+        """Sunucuyu başlat"""
+        app = web.Application()
+        app.router.add_post(self.path, self.handle)
+        app.router.add_get("/healthz", self.health)
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, self.host, self.port).start()
+        logger.info(f"Webhook sunucusu başlatıldı: {self.host}:{self.port}{self.path}")
+
+    async def handle(self, request):
+        """Gelen güncellemeyi doğrula ve uygulama kuyruğuna ekle"""
+        if self.draining:
+            # Kapanırken gelen istekler Telegram tarafından tekrar denenir
+            return web.Response(status=503)
+        token = request.headers.get(SECRET_HEADER, "")
+        if not hmac.compare_digest(token.encode(), self.secret_token.encode()):
+            logger.warning(f"Webhook isteği reddedildi: geçersiz gizli anahtar ({request.remote})")
+            return web.Response(status=403)
+        try:
+            data = await request.json()
+        except ValueError:
+            return web.Response(status=400)
+        update = Update.de_json(data, self.application.bot)
+        await self.application.update_queue.put(update)
+        return web.Response()
+
+    async def health(self, request):
+        """Yük dengeleyici için sağlık kontrolü"""
+        return web.Response(status=503 if self.draining else 200, text="draining" if self.draining else "ok")
+
+    async def stop(self):
+        """Yeni istekleri reddet, kuyruktaki güncellemeler işlenince sunucuyu kapat"""
+        self.draining = True
+        deadline = time.monotonic() + self.drain_timeout
+        while not self.application.update_queue.empty() and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        if not self.application.update_queue.empty():
+            logger.warning(f"Kapatılırken {self.application.update_queue.qsize()} güncelleme işlenemedi")
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+        logger.info("Webhook sunucusu kapatıldı")